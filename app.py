@@ -1,19 +1,24 @@
 import streamlit as st
-import pandas as pd
 import os
 import time
-import base64
+import sqlite3
 from datetime import datetime
-from fpdf import FPDF
-from fpdf.fonts import FontFace
+import fantini
+from fantini import Armazenamento, CacheCatalogo, COLUNAS_FIXAS, ConflitoVersao, EMPRESAS, PASTA_IMAGENS, miniatura
+from fantini.cache_pdf import cache_pdf
+from fantini.livro import ITENS_POR_VOLUME, gerar_livro, nome_livro
+from fantini.regras import ARREDONDAMENTOS
+from fantini import importacao, imagens, desempenho
+from fantini.memoria import bytes_de, densa, relatorio
 
 # --- 1. CONFIGURAÇÃO GERAL ---
 st.set_page_config(layout="wide", page_title="Sistema Fantini", page_icon="📄")
 
-PASTA_IMAGENS = "static"
-ARQUIVO_DB = "banco_produtos_dinamico.csv"
-COLUNAS_FIXAS = ["codigo", "barras", "nome", "imagem", "fabricante"]
-EMPRESAS = ["Vinagre Belmont", "Serve Sempre"]
+# --- MEDIÇÃO (DESLIGADA = SÓ UMA CONSULTA À CONTEXTVAR POR ETAPA) ---
+if "desempenho" not in st.session_state: st.session_state["desempenho"] = desempenho.Coletor("app")
+coletor = st.session_state["desempenho"] if st.session_state.get("desempenho_ativo", desempenho.ATIVO_PADRAO) else None
+desempenho.usar(coletor)
+t_execucao = time.perf_counter()
 
 # --- CSS VISUAL (PREVIEW NA TELA) ---
 # Removemos o background global para corrigir o erro dos campos invisíveis
@@ -44,135 +49,91 @@ st.markdown("""
     .card-title { font-weight: bold; font-size: 14px; color: #000 !important; margin: 0; }
     .card-sub { font-size: 11px; color: #555 !important; margin-top: 2px; }
     .card-price { font-weight: bold; font-size: 16px; color: #2e7d32 !important; }
+    .card-img-vazia { display: inline-block; }
 </style>
 """, unsafe_allow_html=True)
 
-# --- 2. CLASSE PDF (LAYOUT AJUSTADO) ---
-class PDF(FPDF):
-    def header(self):
-        # Logo
-        logo_path = None
-        for ext in ["png", "jpg"]:
-            if os.path.exists(f"static/logo.{ext}"): logo_path = f"static/logo.{ext}"
-        
-        if logo_path:
-            # x=10, y=10, w=30 (Aumentei um pouco o Y para descer a logo)
-            self.image(logo_path, 10, 10, 30) 
-        
-        # Título
-        self.set_y(18) # Desci o título para alinhar com a logo
-        self.set_font('helvetica', 'B', 15)
-        self.cell(45) # Pula a largura da logo
-        self.cell(0, 10, 'FANTINI REPRESENTAÇÕES', ln=False)
-        self.ln(25) # Quebra de linha maior para afastar do conteúdo
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('helvetica', 'I', 8)
-        self.cell(0, 10, f'Pag. {self.page_no()}/{{nb}}', align='C')
-
-def gerar_pdf_final(df_itens, cliente, obs, tabela_col, df_completo):
-    # PDF SETUP
-    pdf = PDF(orientation='P', unit='mm', format='A4')
-    pdf.alias_nb_pages()
-    pdf.add_page()
-    
-    # --- CABEÇALHO CINZA (POSICIONAMENTO NOVO) ---
-    # Antes estava em Y=30. Mudei para Y=45 para não cobrir a logo.
-    y_inicio_box = 45 
-    
-    pdf.set_fill_color(240, 240, 240)
-    # x=10, y=45, w=190, h=25
-    pdf.rect(10, y_inicio_box, 190, 25, 'F')
-    
-    # Textos dentro da caixa cinza
-    pdf.set_y(y_inicio_box + 2) 
-    pdf.set_x(15)
-    pdf.set_font("helvetica", 'B', 10)
-    pdf.cell(0, 5, f"TABELA: {tabela_col.upper()}", ln=True)
-    
-    pdf.set_x(15)
-    pdf.set_font("helvetica", '', 10)
-    pdf.cell(0, 5, f"CLIENTE: {cliente}", ln=True)
-    
-    pdf.set_x(15)
-    pdf.cell(0, 5, f"DATA: {datetime.now().strftime('%d/%m/%Y')}", ln=True)
-    
-    # Espaço para começar a tabela (pula a caixa cinza)
-    pdf.set_y(y_inicio_box + 30) 
-    
-    # --- TABELA DE PRODUTOS ---
-    w_foto = 15
-    w_cod = 25
-    w_desc = 110
-    w_preco = 40
-    col_widths = (w_foto, w_cod, w_desc, w_preco)
-    
-    # line_height=15 garante espaço vertical para a foto
-    with pdf.table(col_widths=col_widths, text_align=("C", "L", "L", "R"), line_height=15) as table:
-        
-        # Cabeçalho da Tabela
-        row = table.row()
-        header_style = FontFace(emphasis="BOLD", color=255, fill_color=(44, 62, 80))
-        row.cell("FOTO", style=header_style)
-        row.cell("CÓDIGO", style=header_style)
-        row.cell("DESCRIÇÃO", style=header_style)
-        row.cell("PREÇO", style=header_style)
-        
-        # Dados
-        pdf.set_font("helvetica", size=9)
-        
-        for idx, item in df_itens.iterrows():
-            row = table.row()
-            
-            # 1. FOTO
-            img_inserida = False
-            try:
-                nome_arq = df_completo.loc[df_completo["codigo"] == item["codigo"], "imagem"].values[0]
-                caminho_img = os.path.join(PASTA_IMAGENS, str(nome_arq))
-                
-                if os.path.exists(caminho_img):
-                    # img_fill_width=True força largura 15mm
-                    row.cell(img=caminho_img, img_fill_width=True)
-                    img_inserida = True
-            except:
-                pass
-            
-            if not img_inserida:
-                row.cell("-")
+# --- PREVIEW (PAGINADO) ---
+ITENS_POR_PAGINA = 20
 
-            # 2. CÓDIGO
-            cod_limpo = str(item['codigo']).replace("AUTO-", "")
-            row.cell(cod_limpo, align="C")
-            
-            # 3. DESCRIÇÃO
-            ean = item['barras'] if str(item['barras']) != "nan" else ""
-            txt_desc = f"{item['nome']}\nEAN: {ean}"
-            row.cell(txt_desc)
-            
-            # 4. PREÇO
-            txt_preco = f"R$ {item[tabela_col]:,.2f}"
-            row.cell(txt_preco, style=FontFace(emphasis="BOLD"))
-
-    # --- RODAPÉ OBS ---
-    pdf.ln(5)
-    pdf.set_font("helvetica", 'I', 8)
-    pdf.multi_cell(0, 5, f"Obs: {obs if obs else 'Sujeito a alteração sem aviso prévio.'}")
-    
-    return pdf.output(dest='S')
+def url_estatica(caminho):
+    # Arquivos de static/ são servidos pelo próprio Streamlit (server.enableStaticServing)
+    rel = os.path.relpath(caminho, PASTA_IMAGENS).replace(os.sep, "/")
+    return f"app/static/{rel}"
+
+def card_produto(row, tabela):
+    caminho_img, _ = indice.caminho_imagem(row["codigo"])
+    if not caminho_img: img_tag = '<span class="card-img card-img-vazia"></span>'
+    else:
+        mini = miniatura(caminho_img, "preview")
+        if coletor: desempenho.contar("preview_bytes_imagens", os.path.getsize(mini))
+        img_tag = f'<img src="{url_estatica(mini)}" class="card-img" loading="lazy">'
+    return f"""
+    <div class="card-produto">
+        {img_tag}
+        <div class="card-body">
+            <div class="card-title">{row['nome']}</div>
+            <div class="card-sub">Cód: {row['codigo']}</div>
+        </div>
+        <div class="card-price">R$ {row[tabela]:,.2f}</div>
+    </div>"""
+
+def resumo_selecao(codigos):
+    # Totais saem do catálogo em bloco (sem montar os cards); faltas de imagem de todos os itens
+    pos = [p for p in (indice.posicao(c) for c in codigos) if p is not None]
+    totais = df[colunas_preco].iloc[pos].sum().astype("float64")  # soma de colunas esparsas sai esparsa
+    faltas = [f for f in (indice.caminho_imagem(c)[1] for c in codigos) if f]
+    return len(pos), totais, faltas
+
+# --- DOWNLOAD (PDF GERADO EM SEGUNDO PLANO) ---
+@st.fragment(run_every=0.5)
+def aguardar_pdf(futuro):
+    # Só este trecho é reexecutado enquanto o PDF fica pronto; o preview não é bloqueado
+    if futuro.done(): st.rerun()
+    st.info("⏳ Gerando PDF...")
+
+def area_download(futuro, cliente):
+    if not futuro.done():
+        aguardar_pdf(futuro); return
+    if futuro.exception() is not None:
+        st.error(f"Erro ao gerar PDF: {futuro.exception()}"); return
+    st.download_button(
+        label="📥 BAIXAR PDF (FINAL)",
+        data=bytes(futuro.result()),
+        file_name=f"Tabela_{cliente if cliente else 'Geral'}.pdf",
+        mime="application/pdf",
+        type="primary",
+        use_container_width=True
+    )
 
 # --- INICIALIZAÇÃO ---
 if not os.path.exists(PASTA_IMAGENS): os.makedirs(PASTA_IMAGENS)
-if not os.path.exists(ARQUIVO_DB): pd.DataFrame(columns=COLUNAS_FIXAS).to_csv(ARQUIVO_DB, index=False)
 if "edit_codigo" not in st.session_state: st.session_state["edit_codigo"] = None
+if "edit_base" not in st.session_state: st.session_state["edit_base"] = None  # versão do catálogo ao começar a editar
+# Outra gravação segurou o banco além do timeout do SQLite (sqlite3.OperationalError: database is locked)
+OCUPADO = "⏳ Catálogo ocupado com outra gravação. Tente de novo em alguns segundos."
+
+@st.cache_resource
+def abrir_banco():
+    # SQLite e catálogo em memória compartilhados por todas as sessões do processo.
+    # Na primeira vez migra o banco_produtos_dinamico.csv e as fotos antigas de static/ para o acervo
+    banco = Armazenamento()
+    imagens.migrar(banco)
+    # Fotos trocadas ou de produtos excluídos não são apagadas na hora: saem aqui, passada a carência
+    imagens.coletar(banco)
+    return banco, CacheCatalogo(banco.versao, banco.carregar, compacto=True)
+
+banco, cache_catalogo = abrir_banco()
 
 def carregar(): 
-    df = pd.read_csv(ARQUIVO_DB)
-    if "fabricante" not in df.columns: df["fabricante"] = "Geral"; df.to_csv(ARQUIVO_DB, index=False)
-    return df
+    # Só relê o banco quando a versão muda; cada sessão recebe uma visão do mesmo catálogo
+    return cache_catalogo.obter()
 
 # --- INTERFACE ---
-df = carregar()
+with desempenho.etapa("carregar"):
+    catalogo = carregar()
+    df = catalogo.df
+    indice = catalogo.indice
 colunas_preco = [c for c in df.columns if c not in COLUNAS_FIXAS]
 
 with st.sidebar:
@@ -192,22 +153,34 @@ with tab_gerador:
     if not tabela_ativa:
         st.warning("Crie tabelas primeiro.")
     else:
-        df_show = df.copy()
-        if filtro_fabrica != "Todos": df_show = df_show[df_show["fabricante"] == filtro_fabrica]
+        termo_pdf = st.text_input("🔍 Buscar:", placeholder="Código, nome ou EAN (vazio = todos)")
+        with desempenho.etapa("busca"):
+            if termo_pdf:
+                # Resultados da busca, do mais relevante para o menos
+                achados = [indice.posicao(c) for c in cache_catalogo.busca().buscar(termo_pdf, limite=200)]
+                df_show = df.iloc[[p for p in achados if p is not None]]
+            else:
+                df_show = df
+        with desempenho.etapa("filtro_fabricante"):
+            if filtro_fabrica != "Todos": df_show = df_show[df_show["fabricante"] == filtro_fabrica]
         
         st.write("1. Selecione os produtos:")
-        df_show.insert(0, "Sel", False)
-        
-        edited = st.data_editor(
-            df_show[["Sel", "codigo", "nome", "barras", tabela_ativa]], 
-            hide_index=True,
-            column_config={
-                "Sel": st.column_config.CheckboxColumn("Add", default=False),
-                tabela_ativa: st.column_config.NumberColumn("Preço", format="R$ %.2f")
-            },
-            disabled=["codigo", "nome", "barras", tabela_ativa],
-            use_container_width=True, height=300
-        )
+        with desempenho.etapa("editor"):
+            # Só as colunas da tela saem do catálogo compartilhado (preço denso para o editor)
+            df_show = densa(df_show, ["codigo", "nome", "barras", tabela_ativa])
+            df_show.insert(0, "Sel", False)
+            desempenho.contar("editor_linhas", len(df_show))
+            
+            edited = st.data_editor(
+                df_show, 
+                hide_index=True,
+                column_config={
+                    "Sel": st.column_config.CheckboxColumn("Add", default=False),
+                    tabela_ativa: st.column_config.NumberColumn("Preço", format="R$ %.2f")
+                },
+                disabled=["codigo", "nome", "barras", tabela_ativa],
+                use_container_width=True, height=300
+            )
         
         st.divider()
         c1, c2 = st.columns(2)
@@ -218,44 +191,62 @@ with tab_gerador:
         
         if not selecionados.empty:
             st.markdown("### 2. Confira (Preview):")
-            
-            for i, row in selecionados.iterrows():
-                # Preview Imagem
-                img_tag = ""
-                try:
-                    nome_arq = df.loc[df["codigo"] == row["codigo"], "imagem"].values[0]
-                    caminho_img = os.path.join(PASTA_IMAGENS, str(nome_arq))
-                    if os.path.exists(caminho_img):
-                        with open(caminho_img, "rb") as f:
-                            b64 = base64.b64encode(f.read()).decode()
-                        img_tag = f'<img src="data:image/jpeg;base64,{b64}" class="card-img">'
-                except: pass
-                
-                # HTML Card Seguro
-                st.markdown(f"""
-                <div class="card-produto">
-                    {img_tag}
-                    <div class="card-body">
-                        <div class="card-title">{row['nome']}</div>
-                        <div class="card-sub">Cód: {row['codigo']}</div>
-                    </div>
-                    <div class="card-price">R$ {row[tabela_ativa]:,.2f}</div>
-                </div>
-                """, unsafe_allow_html=True)
+            with desempenho.etapa("resumo"):
+                qtd, totais, faltas_preview = resumo_selecao(selecionados["codigo"].tolist())
+            m1, m2 = st.columns(2)
+            m1.metric("Itens", qtd)
+            m2.metric(f"Total {tabela_ativa}", f"R$ {totais[tabela_ativa]:,.2f}")
+            with st.expander("Totais por tabela"):
+                st.dataframe({"Tabela": totais.index.tolist(), "Total (R$)": totais.tolist()}, use_container_width=True)
+
+            # Só a página visível vira HTML; as fotos vão como URL da miniatura (o navegador guarda em cache)
+            paginas = max(1, -(-len(selecionados) // ITENS_POR_PAGINA))
+            pagina = st.number_input(f"Página (de {paginas}):", min_value=1, max_value=paginas, value=1, step=1) \
+                if paginas > 1 else 1
+            inicio = (pagina - 1) * ITENS_POR_PAGINA
+            pagina_df = selecionados.iloc[inicio:inicio + ITENS_POR_PAGINA]
+            st.caption(f"Itens {inicio + 1}–{inicio + len(pagina_df)} de {len(selecionados)}")
+            with desempenho.etapa("preview"):
+                st.markdown("".join(card_produto(row, tabela_ativa) for _, row in pagina_df.iterrows()),
+                            unsafe_allow_html=True)
+
+            if faltas_preview:
+                st.warning("⚠️ Itens sem imagem:\n\n" + "\n".join(f"- {f}" for f in faltas_preview))
 
             st.markdown("---")
-            try:
-                pdf_bytes = gerar_pdf_final(selecionados, cliente, obs, tabela_ativa, df)
-                st.download_button(
-                    label="📥 BAIXAR PDF (FINAL)",
-                    data=bytes(pdf_bytes),
-                    file_name=f"Tabela_{cliente if cliente else 'Geral'}.pdf",
-                    mime="application/pdf",
-                    type="primary",
-                    use_container_width=True
-                )
-            except Exception as e:
-                st.error(f"Erro ao gerar PDF: {e}")
+            # PDF memoizado: só é remontado se itens, tabela, cliente, obs, catálogo ou data mudarem
+            chave_pdf = (tuple(selecionados["codigo"].astype(str)), tabela_ativa, cliente, obs,
+                         indice.versao, datetime.now().strftime('%d/%m/%Y'))
+            futuro_pdf = cache_pdf.obter(chave_pdf, fantini.gerar_pdf_final, selecionados.copy(), cliente, obs, tabela_ativa, indice)
+            area_download(futuro_pdf, cliente)
+
+        # --- LIVRO DE PREÇOS (CATÁLOGO INTEIRO, EM VOLUMES) ---
+        with st.expander("📚 Livro de preços (catálogo completo)"):
+            fabs_livro = "todos os fabricantes" if filtro_fabrica == "Todos" else filtro_fabrica
+            st.caption(f"Produtos com preço em {tabela_ativa} ({fabs_livro}): um PDF por fabricante, "
+                       f"em volumes de até {ITENS_POR_VOLUME} produtos, num ZIP.")
+            arquivo_livro = os.path.join("pdfs", nome_livro(tabela_ativa, filtro_fabrica))
+            if st.button("Gerar livro de preços", use_container_width=True):
+                barra = st.progress(0.0, text="Montando...")
+                ultimo = [-1]
+
+                def progresso(feitos, total, fab):
+                    # Uma atualização por ponto percentual (não a cada página)
+                    pct = feitos * 100 // total
+                    if pct != ultimo[0]: ultimo[0] = pct; barra.progress(pct / 100, text=f"{fab}: {feitos}/{total} produtos")
+                os.makedirs("pdfs", exist_ok=True)
+                try:
+                    volumes = gerar_livro(df, tabela_ativa, arquivo_livro, indice, filtro_fabrica, obs, progresso=progresso)
+                    barra.progress(1.0, text=f"{len(volumes)} volume(s), {sum(v['itens'] for v in volumes)} produtos")
+                    st.session_state["livro"] = (arquivo_livro, indice.versao)
+                except ValueError as e:
+                    barra.empty(); st.error(str(e))
+            livro = st.session_state.get("livro")
+            if livro and livro[0] == arquivo_livro and os.path.exists(arquivo_livro):
+                if livro[1] != indice.versao: st.caption("⚠️ O catálogo mudou desde a geração deste livro.")
+                with open(arquivo_livro, "rb") as f:
+                    st.download_button("📥 BAIXAR LIVRO (ZIP)", f, file_name=os.path.basename(arquivo_livro),
+                                       mime="application/zip", use_container_width=True)
 
 # --- ABA 2: CADASTRO ---
 with tab_cadastro:
@@ -264,15 +255,23 @@ with tab_cadastro:
     
     with c2:
         st.info("🔍 **Buscar Produto**")
-        opcoes = df["codigo"].astype(str) + " | " + df["nome"]
-        busca = st.selectbox("Selecione para Editar:", ["Novo"] + list(opcoes))
+        # Só os melhores resultados vão para o navegador, não o catálogo inteiro
+        termo = st.text_input("Código, nome ou EAN:")
+        achados = [c for c in cache_catalogo.busca().buscar(termo) if c in indice] if termo else []
+        opcoes = [f"{c} | {indice.linha(c)['nome']}" for c in achados]
+        if termo and not achados: st.caption("Nenhum produto encontrado.")
+        busca = st.selectbox("Selecione para Editar:", ["Novo"] + opcoes)
         if st.button("Carregar Dados", use_container_width=True):
             st.session_state["edit_codigo"] = busca.split(" | ")[0] if busca != "Novo" else None
+            st.session_state["edit_base"] = indice.versao
             st.rerun()
             
     with c1:
         edit_cod = st.session_state["edit_codigo"]
-        item = df[df["codigo"].astype(str) == str(edit_cod)].iloc[0] if edit_cod else None
+        item = indice.linha(edit_cod) if edit_cod else None
+        if edit_cod and item is None:
+            st.warning(f"Produto {edit_cod} não está mais no catálogo.")
+            st.session_state["edit_codigo"] = None
         
         st.subheader(f"{'✏️ Editando: ' + item['nome'] if item is not None else '➕ Cadastrar Novo Produto'}")
         
@@ -303,39 +302,46 @@ with tab_cadastro:
                 for idx, cp in enumerate(colunas_preco):
                     with cols_p[idx % 3]: # Distribui em colunas
                         v = float(item[cp]) if item is not None else 0.0
-                        precos[cp] = st.number_input(f"{cp} (R$)", value=v)
+                        regra = catalogo.regras.get(cp)
+                        # Tabelas calculadas não são digitadas: saem da regra ao salvar
+                        precos[cp] = st.number_input(f"{cp} (R$)", value=v, disabled=regra is not None,
+                                                     help=f"Calculada: {regra}" if regra else None)
                 
                 st.markdown("<br>", unsafe_allow_html=True)
                 if st.button("💾 SALVAR PRODUTO", type="primary", use_container_width=True):
                     if not nome: st.warning("Nome obrigatório"); st.stop()
                     final_cod = cod if cod else (item["codigo"] if item is not None else f"AUTO-{int(time.time())}")
                     
-                    if not item and str(final_cod) in df["codigo"].astype(str).values:
+                    if item is None and final_cod in indice:
                         st.error("Código já existe!"); st.stop()
 
-                    img_name = "sem_foto.png"
-                    if item is not None:
-                        # Remove antigo para salvar novo
-                        df = df[df["codigo"].astype(str) != str(final_cod)]
-                        old_row = pd.read_csv(ARQUIVO_DB)
-                        old_row = old_row[old_row["codigo"].astype(str) == str(final_cod)]
-                        if not old_row.empty: img_name = old_row.iloc[0]["imagem"]
+                    img_name = item["imagem"] if item is not None else "sem_foto.png"
 
-                    if file:
-                        img_name = f"{final_cod}_{file.name}"
-                        with open(f"{PASTA_IMAGENS}/{img_name}", "wb") as f: f.write(file.getbuffer())
+                    # Foto guardada pelo conteúdo: a mesma imagem em vários produtos é um arquivo só
+                    if file: img_name = imagens.guardar(file.getvalue(), file.name)
 
                     new_row = {"codigo": final_cod, "barras": ean, "nome": nome, "fabricante": fab, "imagem": img_name}
                     new_row.update(precos)
-                    
-                    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True).fillna(0)
-                    df.to_csv(ARQUIVO_DB, index=False)
+                    # Só grava se ninguém mexeu neste produto desde que a edição começou
+                    base = st.session_state["edit_base"] if item is not None else indice.versao
+                    try:
+                        versao = banco.salvar_produto(new_row, base=base)
+                    except ConflitoVersao as e:
+                        st.error(f"⚠️ {e} Clique em 'Carregar Dados' para ver a versão atual antes de salvar."); st.stop()
+                    except sqlite3.OperationalError:
+                        st.error(OCUPADO); st.stop()
+                    cache_catalogo.aplicar_upsert(new_row, versao)
                     st.success("✅ Produto Salvo!"); st.session_state["edit_codigo"] = None; st.rerun()
                 
                 if item is not None:
                     if st.button("🗑️ Excluir Produto", use_container_width=True):
-                        df = df[df["codigo"].astype(str) != str(final_cod)]
-                        df.to_csv(ARQUIVO_DB, index=False)
+                        try:
+                            versao = banco.excluir_produto(item["codigo"], base=st.session_state["edit_base"])
+                        except ConflitoVersao as e:
+                            st.error(f"⚠️ {e} Clique em 'Carregar Dados' para ver a versão atual."); st.stop()
+                        except sqlite3.OperationalError:
+                            st.error(OCUPADO); st.stop()
+                        cache_catalogo.aplicar_exclusao(item["codigo"], versao)
                         st.success("Produto Excluído!"); st.session_state["edit_codigo"] = None; st.rerun()
 
 # --- ABA 3: TABELAS ---
@@ -345,9 +351,120 @@ with tab_config:
         n = st.text_input("Nova Tabela de Preço:")
         if st.button("Criar Tabela"):
             if n and n not in df.columns: 
-                df[n] = 0.0; df.to_csv(ARQUIVO_DB, index=False); st.rerun()
+                try:
+                    cache_catalogo.aplicar_tabela(n, banco.criar_tabela(n)); st.rerun()
+                except ValueError as e:  # criada por outra sessão enquanto isso
+                    st.error(str(e))
+                except sqlite3.OperationalError:
+                    st.error(OCUPADO)
     with c2:
         if colunas_preco:
             d = st.selectbox("Apagar Tabela:", colunas_preco)
             if st.button("Apagar Definitivamente"):
-                df = df.drop(columns=[d]); df.to_csv(ARQUIVO_DB, index=False); st.rerun()
+                try:
+                    cache_catalogo.aplicar_tabela(d, banco.apagar_tabela(d), remover=True); st.rerun()
+                except ValueError as e:
+                    st.error(str(e))
+                except sqlite3.OperationalError:
+                    st.error(OCUPADO)
+
+    # Tabelas calculadas a partir de outra (ex.: ATACADO = VAREJO × 0,92, final ,x9)
+    st.divider()
+    st.write("🧮 **Regras de Preço**")
+    for r in catalogo.regras.values(): st.caption(f"• {r}")
+    if colunas_preco:
+        r1, r2, r3, r4 = st.columns([2, 2, 1, 2])
+        alvo = r1.text_input("Tabela calculada:", placeholder="Ex.: ATACADO")
+        base_regra = r2.selectbox("A partir de:", [c for c in colunas_preco if c != alvo])
+        fator = r3.number_input("Fator:", value=1.0, step=0.01, format="%.4f")
+        arred = r4.selectbox("Arredondamento:", list(ARREDONDAMENTOS), format_func=ARREDONDAMENTOS.get)
+        b1, b2 = st.columns(2)
+        if b1.button("Salvar Regra", use_container_width=True) and alvo:
+            try:
+                versao = banco.definir_regra(alvo, base_regra, fator, arred)
+                cache_catalogo.aplicar_regra(alvo, banco.regras()[alvo], versao); st.rerun()
+            except ValueError as e:
+                st.error(str(e))
+            except sqlite3.OperationalError:
+                st.error(OCUPADO)
+        if b2.button("Remover Regra (mantém os valores)", use_container_width=True) and alvo in catalogo.regras:
+            try:
+                cache_catalogo.aplicar_regra(alvo, None, banco.remover_regra(alvo)); st.rerun()
+            except sqlite3.OperationalError:
+                st.error(OCUPADO)
+
+    # Lista do fornecedor inteira de uma vez (lida em blocos, gravada numa transação só)
+    st.divider()
+    with st.expander("📥 Importar Lista de Preços (CSV / XLSX)"):
+        arq = st.file_uploader("Arquivo do fornecedor:", type=["csv", "txt", "xlsx"])
+        cols_arq = []
+        if arq:
+            try:
+                cols_arq = importacao.colunas_do_arquivo(arq, arq.name)
+            except (ValueError, RuntimeError) as e:  # arquivo vazio/ilegível, .xlsx sem openpyxl
+                st.error(f"Não foi possível ler o arquivo: {e}")
+        if cols_arq:
+            manuais = [c for c in colunas_preco if c not in catalogo.regras]
+            sugestao = importacao.mapear_colunas(cols_arq, manuais)
+            destinos = ["(ignorar)", "codigo", "barras", "nome", "fabricante"] + manuais
+            st.write("Colunas do arquivo → Sistema:")
+            mapa = {}
+            cols_m = st.columns(3)
+            for i, c in enumerate(cols_arq):
+                escolha = cols_m[i % 3].selectbox(c, destinos, index=destinos.index(sugestao.get(c, "(ignorar)")),
+                                                  key=f"mapa_imp_{c}")
+                mapa[c] = None if escolha == "(ignorar)" else escolha
+            fab_imp = st.selectbox("Fabricante dos produtos:", ["(da planilha / manter)"] + EMPRESAS)
+            simular = st.checkbox("Só conferir (não grava nada)")
+            if st.button("Importar Lista", type="primary"):
+                barra = st.progress(0.0, text="Importando...")
+                def avancar(n):
+                    pos = arq.tell() / arq.size if arq.size and not arq.name.lower().endswith("xlsx") else 0.0
+                    barra.progress(min(pos, 1.0), text=f"{n} linhas lidas")
+                try:
+                    rel = importacao.importar(arq, banco, nome=arq.name, mapa=mapa, simular=simular, progresso=avancar,
+                                              fabricante=fab_imp if fab_imp in EMPRESAS else None)
+                except (ValueError, RuntimeError) as e:
+                    st.error(str(e))
+                except sqlite3.OperationalError:
+                    st.error(OCUPADO)
+                else:
+                    barra.progress(1.0, text=f"{rel['lidas']} linhas lidas")
+                    if not simular: cache_catalogo.invalidar()
+                    st.success(f"{'Conferência' if simular else 'Importação'}: {rel['inseridos']} novos, "
+                               f"{rel['atualizados']} atualizados, {rel['repetidos']} repetidos no arquivo, "
+                               f"{rel['rejeitados']} rejeitados.")
+                    if rel["exemplos_rejeicao"]:
+                        st.warning("Linhas rejeitadas:\n\n" + "\n".join(f"- {x}" for x in rel["exemplos_rejeicao"]))
+
+    st.divider()
+    # Compatibilidade: o catálogo continua exportável no layout do CSV antigo
+    if st.button("Exportar Catálogo (CSV)"):
+        st.download_button("📥 Baixar CSV", data=banco.exportar_csv(), file_name="banco_produtos_dinamico.csv",
+                           mime="text/csv")
+
+# --- MEMÓRIA (CATÁLOGO COMPARTILHADO x ESTA SESSÃO) ---
+@st.cache_data(max_entries=2, show_spinner=False)
+def memoria_catalogo(versao):
+    return relatorio(catalogo.df)
+
+with st.sidebar.expander("💾 Memória"):
+    mem = memoria_catalogo(catalogo.versao)
+    compacto, largo = int(mem["bytes"].sum()), int(mem["bytes_largo"].sum())
+    st.metric("Catálogo (uma cópia por processo)", f"{compacto / 2**20:.2f} MB",
+              f"-{1 - compacto / largo:.0%} vs. formato largo ({largo / 2**20:.2f} MB)" if largo else None,
+              delta_color="off")
+    # O que é só desta sessão: estado dos widgets e as tabelas montadas nesta execução
+    quadros = {n: globals()[n] for n in ("df_show", "edited", "selecionados") if n in globals()}
+    st.metric("Esta sessão", f"{(bytes_de(dict(st.session_state)) + bytes_de(quadros)) / 2**20:.2f} MB")
+    st.dataframe(mem.assign(KB=mem["bytes"] / 1024, KB_largo=mem["bytes_largo"] / 1024)[["coluna", "tipo", "KB", "KB_largo"]],
+                 hide_index=True, use_container_width=True)
+
+# --- DESEMPENHO ---
+with st.sidebar:
+    st.toggle("⏱️ Desempenho", value=desempenho.ATIVO_PADRAO, key="desempenho_ativo",
+              help="Mede cada etapa desta sessão e grava no log JSONL")
+if coletor is not None:
+    coletor.registrar("execucao", time.perf_counter() - t_execucao)
+    desempenho.painel(coletor)
+    coletor.fechar()
@@ -0,0 +1,63 @@
+"""Peças comuns dos benchmarks: medição, cabeçalho do resultado e gravação do JSON.
+
+Todos os scripts de benchmarks/ montam o resultado com `resultado()` e gravam com `gravar()`,
+então os metadados da rodada (data, commit, Python, plataforma) e o formato do arquivo são
+os mesmos em todos e podem ser comparados entre versões.
+"""
+import os
+import json
+import time
+import platform
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir(fn, repeticoes, aquecer=False):
+    """Mediana/mínimo de `repeticoes` chamadas de `fn()` (a de aquecimento não conta)."""
+    if aquecer: fn()
+    amostras = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        amostras.append(time.perf_counter() - t0)
+    return {"mediana_s": round(statistics.median(amostras), 6), "min_s": round(min(amostras), 6),
+            "amostras_s": [round(a, 6) for a in amostras]}
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def ambiente():
+    """Variáveis de ambiente para um processo filho que importa o fantini da raiz do repositório."""
+    return dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+
+def erro(r):
+    """Última linha do stderr de um processo filho que falhou (ou o código de saída)."""
+    return r.stderr.strip().splitlines()[-1] if r.stderr.strip() else f"código {r.returncode}"
+
+
+def resultado(benchmark, parametros):
+    """Cabeçalho do resultado; as medidas vão em ["medidas"]."""
+    return {"benchmark": benchmark, "data": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit(),
+            "python": platform.python_version(), "plataforma": platform.platform(),
+            "parametros": parametros, "medidas": {}}
+
+
+def argumento_saida(ap):
+    ap.add_argument("--saida", help="grava o JSON neste arquivo (padrão: só imprime)")
+
+
+def gravar(resultado, saida=None):
+    dados = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if saida:
+        with open(saida, "w", encoding="utf-8") as f: f.write(dados + "\n")
+    else:
+        print(dados)
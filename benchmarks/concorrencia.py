@@ -0,0 +1,206 @@
+"""Estresse de escritas concorrentes: várias threads salvando, excluindo e criando tabelas ao mesmo tempo.
+
+Cada thread faz o papel de uma sessão: lê a versão do catálogo (`base`), "pensa" um pouco e grava
+com essa base. Parte dos produtos é compartilhada (conflitos esperados), parte é exclusiva de cada
+thread (nunca pode dar conflito). Uma thread leitora fica recarregando o catálogo o tempo todo.
+No fim confere:
+  - nenhuma atualização perdida: entre a base e a versão de cada escrita aceita, nenhuma outra
+    escrita aceita mexeu no mesmo código;
+  - o banco termina com a última escrita aceita de cada código (ou sem o código, se foi excluído);
+  - cada tabela criada por várias threads ao mesmo tempo foi criada uma vez só;
+  - no simulador (meus_produtos.csv), edições de skus diferentes por threads diferentes não se perdem.
+Também mede operações por segundo e a latência das leituras durante as escritas.
+
+Uso:
+    python benchmarks/concorrencia.py [--threads 8] [--segundos 5] [--compartilhados 20] [--saida r.json]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+from comum import RAIZ, argumento_saida, gravar, resultado as cabecalho
+
+sys.path.insert(0, RAIZ)
+
+TABELAS_DISPUTADAS = 6  # nomes de tabela que todas as threads tentam criar
+
+
+def _sessao(n, banco, compartilhados, fim, registro, rnd):
+    from fantini.armazenamento import ConflitoVersao
+    proprios = [f"T{n:02d}-{i}" for i in range(5)]
+    cont = {"aceitas": 0, "conflitos": 0, "conflitos_proprios": 0, "tabelas_repetidas": 0, "erros": []}
+    i = 0
+    while not fim.is_set():
+        i += 1
+        base = banco.versao()
+        time.sleep(rnd.random() * 0.002)  # a sessão "pensa" entre ler e gravar
+        op = rnd.random()
+        try:
+            if op < 0.45:
+                cod = rnd.choice(compartilhados)
+                linha = {"codigo": cod, "nome": f"s{n}-{i}", "fabricante": "Serve Sempre", "VAREJO": n + i / 1000}
+                registro.append((banco.salvar_produto(linha, base=base), base, cod, linha["nome"]))
+            elif op < 0.6:
+                cod = rnd.choice(compartilhados)
+                registro.append((banco.excluir_produto(cod, base=base), base, cod, None))
+            elif op < 0.95:
+                cod = rnd.choice(proprios)
+                linha = {"codigo": cod, "nome": f"s{n}-{i}", "fabricante": "Vinagre Belmont", "VAREJO": i}
+                try:
+                    registro.append((banco.salvar_produto(linha, base=base), base, cod, linha["nome"]))
+                except ConflitoVersao:
+                    cont["conflitos_proprios"] += 1
+                    raise
+            else:
+                nome = f"DISPUTADA {rnd.randrange(TABELAS_DISPUTADAS)}"
+                try:
+                    registro.append((banco.criar_tabela(nome), base, "tabela:" + nome, nome))
+                except ValueError as e:
+                    if isinstance(e, ConflitoVersao): raise
+                    cont["tabelas_repetidas"] += 1
+                    continue
+            cont["aceitas"] += 1
+        except ConflitoVersao:
+            cont["conflitos"] += 1
+        except Exception as e:  # qualquer outro erro (ex.: "database is locked") reprova o teste
+            cont["erros"].append(f"{type(e).__name__}: {e}")
+    return cont
+
+
+def _leitor(banco, fim, tempos):
+    while not fim.is_set():
+        t0 = time.perf_counter()
+        banco.carregar()
+        tempos.append(time.perf_counter() - t0)
+
+
+def conferir(banco, registro, iniciais=()):
+    """Lista de violações (vazia = ok) a partir das escritas aceitas e do estado final do banco.
+
+    `iniciais`: códigos que já existiam antes das threads começarem.
+    """
+    violacoes = []
+    por_codigo = {}
+    for versao, base, cod, valor in registro:
+        por_codigo.setdefault(cod, []).append((versao, base, valor))
+    tabelas = set(banco.tabelas())
+    for cod, escritas in por_codigo.items():
+        escritas.sort()
+        if cod.startswith("tabela:"):
+            if len(escritas) != 1: violacoes.append(f"{cod}: criada {len(escritas)} vezes")
+            if cod[7:] not in tabelas: violacoes.append(f"{cod}: não está no banco")
+            continue
+        # Exclusão de código que já não existia não muda nada: não conta como escrita
+        versoes, presente = [], cod in iniciais
+        for versao, _, valor in escritas:
+            if valor is not None or presente: versoes.append(versao)
+            presente = valor is not None
+        for versao, base, _ in escritas:
+            # Outra escrita aceita entre a base e esta = atualização perdida
+            meio = [v for v in versoes if base < v < versao]
+            if meio: violacoes.append(f"{cod}: escrita v{versao} (base {base}) passou por cima de v{meio[0]}")
+        final = escritas[-1][2]
+        item = banco.obter(cod)
+        atual = None if item is None else item["nome"]
+        if atual != final: violacoes.append(f"{cod}: banco tem {atual!r}, última escrita aceita foi {final!r}")
+    return violacoes
+
+
+def estresse_catalogo(pasta, threads, segundos, compartilhados, semente):
+    from concurrent.futures import ThreadPoolExecutor
+    from fantini.armazenamento import Armazenamento
+    banco = Armazenamento(os.path.join(pasta, "estresse.db"), csv_legado=None)
+    banco.criar_tabela("VAREJO")
+    codigos = [f"C{i:03d}" for i in range(compartilhados)]
+    for cod in codigos: banco.salvar_produto({"codigo": cod, "nome": "inicial", "VAREJO": 1.0})
+    registro, leituras = [], []  # list.append é atômico: as threads gravam direto
+    fim = threading.Event()
+    leitor = threading.Thread(target=_leitor, args=(banco, fim, leituras), daemon=True)
+    leitor.start()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        futuros = [ex.submit(_sessao, n, banco, codigos, fim, registro, random.Random(semente + n))
+                   for n in range(threads)]
+        time.sleep(segundos)
+        fim.set()
+        contagens = [f.result() for f in futuros]
+    duracao = time.perf_counter() - t0
+    leitor.join()
+    total = {k: sum(c[k] for c in contagens) for k in ("aceitas", "conflitos", "conflitos_proprios", "tabelas_repetidas")}
+    erros = [e for c in contagens for e in c["erros"]]
+    violacoes = conferir(banco, registro, set(codigos))
+    if total["conflitos_proprios"]: violacoes.append(f"{total['conflitos_proprios']} conflitos em produtos exclusivos")
+    violacoes += erros[:10]
+    ms = sorted(t * 1000 for t in leituras)
+    return {"threads": threads, "segundos": round(duracao, 2), **total,
+            "escritas_por_s": round(total["aceitas"] / duracao, 1),
+            "leituras": len(ms), "leitura_p50_ms": round(statistics.median(ms), 2) if ms else None,
+            "leitura_max_ms": round(ms[-1], 2) if ms else None, "erros": len(erros), "violacoes": violacoes}
+
+
+def estresse_vendas(pasta, threads, rodadas):
+    """Cada thread edita os próprios skus com `mesclar_alteracoes` sobre retratos defasados."""
+    import pandas as pd
+    from concurrent.futures import ThreadPoolExecutor
+    from fantini.vendas import gravar_dados, mesclar_alteracoes
+    caminho = os.path.join(pasta, "meus_produtos.csv")
+    gravar_dados(pd.DataFrame([{"sku": f"V{n:02d}-{i}", "produto": "inicial", "imagem_url": "", "custo_base": 1.0,
+                                "moeda_base": "BRL"} for n in range(threads) for i in range(3)]), caminho)
+
+    def sessao(n):
+        conflitos = 0
+        for r in range(rodadas):
+            base = pd.read_csv(caminho)  # retrato desta sessão (fica velho assim que outra grava)
+            editado = base.copy()
+            editado.loc[editado["sku"].str.startswith(f"V{n:02d}-"), "custo_base"] = float(r + 1)
+            conflitos += len(mesclar_alteracoes(base, editado, caminho)[2])
+        return conflitos
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        conflitos = sum(ex.map(sessao, range(threads)))
+    final = pd.read_csv(caminho)
+    perdidas = int((final["custo_base"] != float(rodadas)).sum())
+    violacoes = [f"{perdidas} linhas sem a última edição da própria sessão"] if perdidas else []
+    if len(final) != threads * 3: violacoes.append(f"{len(final)} linhas no arquivo, esperadas {threads * 3}")
+    if conflitos: violacoes.append(f"{conflitos} conflitos em skus exclusivos")
+    return {"threads": threads, "rodadas": rodadas, "linhas": len(final), "violacoes": violacoes}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--segundos", type=float, default=5.0)
+    ap.add_argument("--compartilhados", type=int, default=20, help="produtos que todas as threads disputam")
+    ap.add_argument("--rodadas-vendas", type=int, default=20)
+    ap.add_argument("--semente", type=int, default=42)
+    argumento_saida(ap)
+    a = ap.parse_args(argv)
+
+    pasta = tempfile.mkdtemp(prefix="fantini_concorrencia_")
+    try:
+        catalogo = estresse_catalogo(pasta, a.threads, a.segundos, a.compartilhados, a.semente)
+        vendas = estresse_vendas(pasta, a.threads, a.rodadas_vendas)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    resultado = cabecalho("concorrencia", {"threads": a.threads, "segundos": a.segundos,
+                                           "compartilhados": a.compartilhados, "rodadas_vendas": a.rodadas_vendas,
+                                           "semente": a.semente})
+    resultado["medidas"] = {"catalogo": catalogo, "vendas": vendas}
+    print(f"catálogo: {catalogo['aceitas']} escritas aceitas ({catalogo['escritas_por_s']}/s), "
+          f"{catalogo['conflitos']} conflitos, {catalogo['tabelas_repetidas']} tabelas repetidas recusadas, "
+          f"{catalogo['leituras']} leituras (p50 {catalogo['leitura_p50_ms']} ms, máx {catalogo['leitura_max_ms']} ms)",
+          file=sys.stderr)
+    violacoes = catalogo["violacoes"] + vendas["violacoes"]
+    for v in violacoes: print(f"VIOLAÇÃO: {v}", file=sys.stderr)
+    print("ok" if not violacoes else f"{len(violacoes)} violações", file=sys.stderr)
+
+    gravar(resultado, a.saida)
+    return 1 if violacoes else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""Catálogos sintéticos e reprodutíveis (mesma semente = mesmos dados) para os benchmarks.
+
+Gera, numa pasta:
+  - banco_produtos_dinamico.csv: layout do catálogo (codigo, barras, nome, imagem, fabricante + tabelas);
+  - meus_produtos.csv: layout do simulador (sku, produto, imagem_url, custo_base, moeda_base);
+  - static/imagens/: as fotos, já no acervo por conteúdo (várias linhas repetem a mesma foto).
+
+Uso:
+    python benchmarks/gerar_catalogo.py PASTA [--linhas 10000] [--tabelas 8] [--imagens 50] [--semente 42]
+"""
+import io
+import os
+import sys
+import csv
+import random
+import argparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+FABRICANTES = ["Vinagre Belmont", "Serve Sempre"]
+PALAVRAS = ["vinagre", "alcool", "maca", "colorido", "tinto", "composto", "pano", "piso", "balde",
+            "rodo", "esponja", "detergente", "sabao", "flanela", "vassoura", "luva", "saco", "lixo"]
+MEDIDAS = ["500ML", "750ML", "1L", "2L", "5L", "30X50CM", "40X60CM", "UN", "CX 12"]
+FRACAO_SEM_FOTO = 0.1
+URL_IMAGENS = "http://127.0.0.1:8765/img"  # simulador: fotos remotas (servidor local nos benchmarks)
+FRACAO_PRECO = 0.3  # tabelas além da primeira: só 30% dos produtos têm preço (o resto é 0,0)
+
+
+def _ean13(rnd):
+    corpo = [7, 8, 9] + [rnd.randrange(10) for _ in range(9)]
+    soma = sum(d * (3 if i % 2 else 1) for i, d in enumerate(corpo))
+    return "".join(map(str, corpo)) + str((10 - soma % 10) % 10)
+
+
+def gerar_imagens(pasta, quantidade, rnd, lado=400):
+    """Fotos PNG distintas no acervo (static/imagens). Retorna os valores da coluna imagem."""
+    from PIL import Image, ImageDraw
+    from fantini.imagens import guardar
+    nomes = []
+    for i in range(quantidade):
+        img = Image.new("RGBA", (lado, lado), (255, 255, 255, 0))
+        d = ImageDraw.Draw(img)
+        for _ in range(6):
+            x0, y0 = rnd.randrange(lado // 2), rnd.randrange(lado // 2)
+            d.rectangle([x0, y0, x0 + rnd.randrange(40, lado // 2), y0 + rnd.randrange(40, lado // 2)],
+                        fill=(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256), 255))
+        d.text((10, 10), f"#{i}", fill=(0, 0, 0, 255))
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        nomes.append(guardar(buf.getvalue(), "foto.png", os.path.join(pasta, "static")))
+    return nomes
+
+
+def gerar_catalogo(pasta, linhas=10000, tabelas=8, imagens=50, semente=42):
+    """Escreve banco_produtos_dinamico.csv (+ fotos) em `pasta`. Retorna o caminho do CSV."""
+    rnd = random.Random(semente)
+    os.makedirs(pasta, exist_ok=True)
+    fotos = gerar_imagens(pasta, imagens, rnd) if imagens else []
+    nomes_tabelas = ["VAREJO"] + [f"TABELA {i:02d}" for i in range(1, tabelas)]
+    caminho = os.path.join(pasta, "banco_produtos_dinamico.csv")
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["codigo", "barras", "nome", "imagem", "fabricante"] + nomes_tabelas[:tabelas])
+        for i in range(linhas):
+            nome = " ".join(rnd.sample(PALAVRAS, 3)).upper() + " - " + rnd.choice(MEDIDAS)
+            foto = rnd.choice(fotos) if fotos and rnd.random() >= FRACAO_SEM_FOTO else "sem_foto.png"
+            base = round(rnd.uniform(2, 200), 2)
+            precos = [base] + [round(base * rnd.uniform(0.8, 1.3), 2) if rnd.random() < FRACAO_PRECO else 0.0
+                               for _ in range(tabelas - 1)]
+            w.writerow([f"{i // 1000:02d}.{i % 1000:03d}.{rnd.randrange(100):02d}", _ean13(rnd), nome, foto,
+                        rnd.choice(FABRICANTES)] + precos[:tabelas])
+    return caminho
+
+
+def gerar_vendas(pasta, linhas=10000, semente=42, url_imagens=URL_IMAGENS, imagens=500):
+    """Escreve meus_produtos.csv (layout do simulador de preços) em `pasta`."""
+    rnd = random.Random(semente + 1)
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, "meus_produtos.csv")
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["sku", "produto", "imagem_url", "custo_base", "moeda_base"])
+        for i in range(linhas):
+            w.writerow([f"SKU-{i:06d}", " ".join(rnd.sample(PALAVRAS, 2)).title(),
+                        f"{url_imagens}/{rnd.randrange(imagens)}.jpg",
+                        round(rnd.uniform(5, 2000), 2), "USD" if rnd.random() < 0.3 else "BRL"])
+    return caminho
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gera catálogos sintéticos para os benchmarks")
+    ap.add_argument("pasta")
+    ap.add_argument("--linhas", type=int, default=10000)
+    ap.add_argument("--tabelas", type=int, default=8, help="tabelas de preço no catálogo")
+    ap.add_argument("--imagens", type=int, default=50, help="fotos distintas (repetidas entre os produtos)")
+    ap.add_argument("--semente", type=int, default=42)
+    a = ap.parse_args(argv)
+    print(gerar_catalogo(a.pasta, a.linhas, a.tabelas, a.imagens, a.semente))
+    print(gerar_vendas(a.pasta, a.linhas, a.semente))
+
+
+if __name__ == "__main__":
+    main()
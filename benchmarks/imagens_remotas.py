@@ -0,0 +1,161 @@
+"""Prefetch das fotos remotas do simulador contra um servidor HTTP local (substituto do site).
+
+O servidor gera JPEGs em /img/<n>.jpg com ETag (responde 304 a If-None-Match), atraso
+configurável e falhas temporárias (503) em uma fração das requisições, para exercitar
+timeouts e novas tentativas. Mede, para cada número de workers:
+  - a frio: cache vazio, todas as fotos baixadas e reduzidas;
+  - quente: tudo dentro do TTL, nenhuma requisição;
+  - revalidação: TTL vencido, tudo volta como 304;
+  - despejo: com limite de 1/4 do tamanho total, o cache descarta as mais antigas (e um
+    novo prefetch não reagenda nenhuma delas).
+E confere que a vitrine recebe URLs locais (app/static/_remotas/...) para todas as fotos.
+
+Uso:
+    python benchmarks/imagens_remotas.py [--fotos 300] [--workers 1 4 16] [--atraso-ms 30]
+                                         [--falhas 0.05] [--saida resultado.json]
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from comum import RAIZ, argumento_saida, gravar, resultado as cabecalho
+
+sys.path.insert(0, RAIZ)
+
+
+class ServidorFotos:
+    """Servidor local de fotos sintéticas, com contadores por tipo de resposta."""
+
+    def __init__(self, atraso=0.03, falhas=0.05, semente=42, lado=800):
+        self.atraso = atraso
+        self.falhas = falhas
+        self.lado = lado
+        self._rnd = random.Random(semente)
+        self._fotos = {}
+        self._lock = threading.Lock()
+        self.contagem = {"200": 0, "304": 0, "503": 0, "404": 0}
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args): pass
+
+            def do_GET(self):
+                servidor._responder(self)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/img"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _foto(self, n):
+        with self._lock:
+            if n not in self._fotos:
+                from PIL import Image
+                rnd = random.Random(n)
+                img = Image.new("RGB", (self.lado, self.lado), tuple(rnd.randrange(256) for _ in range(3)))
+                buf = io.BytesIO()
+                img.save(buf, "JPEG", quality=90)
+                dados = buf.getvalue()
+                self._fotos[n] = (dados, '"' + hashlib.md5(dados).hexdigest() + '"')
+            return self._fotos[n]
+
+    def _contar(self, codigo):
+        with self._lock: self.contagem[str(codigo)] += 1
+
+    def _responder(self, req):
+        time.sleep(self.atraso)
+        nome = req.path.rsplit("/", 1)[-1]
+        if not nome.endswith(".jpg") or not nome[:-4].isdigit():
+            self._contar(404); req.send_error(404); return
+        with self._lock: falhar = self._rnd.random() < self.falhas
+        if falhar:
+            self._contar(503); req.send_error(503); return
+        dados, etag = self._foto(int(nome[:-4]))
+        if req.headers.get("If-None-Match") == etag:
+            self._contar(304)
+            req.send_response(304); req.send_header("ETag", etag); req.end_headers(); return
+        self._contar(200)
+        req.send_response(200)
+        req.send_header("Content-Type", "image/jpeg")
+        req.send_header("Content-Length", str(len(dados)))
+        req.send_header("ETag", etag)
+        req.end_headers()
+        req.wfile.write(dados)
+
+    def zerar(self):
+        with self._lock: self.contagem = dict.fromkeys(self.contagem, 0)
+
+    def parar(self):
+        self.httpd.shutdown()
+
+
+def rodada(servidor, urls, workers, pasta):
+    from fantini.imagens_remotas import CacheImagensRemotas
+    resultado = {}
+    cache = CacheImagensRemotas(os.path.join(pasta, "_remotas"), workers=workers, timeout=2.0, espera_base=0.05)
+    for fase in ("frio", "quente"):
+        servidor.zerar()
+        t0 = time.perf_counter()
+        cache.aguardar(urls)
+        resultado[fase] = {"segundos": round(time.perf_counter() - t0, 4), "respostas": dict(servidor.contagem)}
+    # TTL vencido: nova instância lendo o índice do disco, com TTL zero
+    cache.fechar()
+    cache = CacheImagensRemotas(os.path.join(pasta, "_remotas"), workers=workers, timeout=2.0, espera_base=0.05, ttl=0)
+    servidor.zerar()
+    t0 = time.perf_counter()
+    cache.aguardar(urls)
+    resultado["revalidacao"] = {"segundos": round(time.perf_counter() - t0, 4), "respostas": dict(servidor.contagem)}
+    resultado["locais"] = cache.prontas(urls)
+    resultado["estatisticas"] = dict(cache.estatisticas)
+    resultado["bytes_cache"] = cache._total_bytes
+    cache.fechar()
+    # Limite pequeno: o cache tem que despejar e ficar abaixo dele
+    limite = resultado["bytes_cache"] // 4
+    cache = CacheImagensRemotas(os.path.join(pasta, "_limitado"), workers=workers, timeout=2.0, espera_base=0.05,
+                                limite_bytes=limite)
+    cache.aguardar(urls)
+    resultado["despejo"] = {"limite_bytes": limite, "bytes_cache": cache._total_bytes,
+                            "despejadas": cache.estatisticas["despejadas"], "dentro_do_limite": cache._total_bytes <= limite,
+                            # Próximo rerun: as despejadas não podem voltar para a fila antes do TTL
+                            "reagendadas": len(cache.prefetch(urls))}
+    cache.fechar()
+    return resultado
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--fotos", type=int, default=300)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--atraso-ms", type=float, default=30.0, help="latência do servidor por requisição")
+    ap.add_argument("--falhas", type=float, default=0.05, help="fração de respostas 503")
+    argumento_saida(ap)
+    a = ap.parse_args(argv)
+
+    servidor = ServidorFotos(a.atraso_ms / 1000, a.falhas)
+    urls = [f"{servidor.url}/{i}.jpg" for i in range(a.fotos)]
+    resultado = cabecalho("imagens_remotas", {"fotos": a.fotos, "atraso_ms": a.atraso_ms, "falhas": a.falhas})
+    try:
+        for w in a.workers:
+            pasta = tempfile.mkdtemp(prefix="fantini_remotas_")
+            try:
+                resultado["medidas"][f"workers_{w}"] = m = rodada(servidor, urls, w, pasta)
+            finally:
+                shutil.rmtree(pasta, ignore_errors=True)
+            print(f"workers={w:3d}  frio {m['frio']['segundos']:7.2f}s  quente {m['quente']['segundos']:6.3f}s  "
+                  f"revalidação {m['revalidacao']['segundos']:6.2f}s  locais {m['locais']}/{a.fotos}  "
+                  f"tentativas extras {m['estatisticas']['tentativas_extras']}  despejadas {m['despejo']['despejadas']}", file=sys.stderr)
+    finally:
+        servidor.parar()
+
+    gravar(resultado, a.saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Tempo de inicialização: import a frio do núcleo e latência até o primeiro PDF/render.
+
+Cada medida roda num processo Python novo (import realmente a frio), N vezes; o
+resultado vai em JSON para comparar entre versões.
+
+Uso:
+    python benchmarks/inicializacao.py [-n 5] [--saida resultado.json]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from comum import RAIZ, ambiente, argumento_saida, erro, gravar, resultado as cabecalho
+
+# nome -> código executado no processo filho (o tempo medido é o do bloco todo)
+MEDIDAS = {
+    "python_vazio": "pass",
+    "import_fantini": "import fantini",
+    "import_nucleo": "from fantini import Armazenamento, CacheCatalogo, IndiceCatalogo, miniatura",
+    "import_pdf": "import fantini.pdf",
+    "primeiro_pdf": (
+        "from fantini import Armazenamento, IndiceCatalogo, gerar_pdf_final\n"
+        "df = Armazenamento().carregar()\n"
+        "tabela = [c for c in df.columns if c not in ('codigo','barras','nome','imagem','fabricante')][0]\n"
+        "gerar_pdf_final(df.head(10), 'Bench', '', tabela, IndiceCatalogo(df))"
+    ),
+    "primeiro_render_app": (
+        "from streamlit.testing.v1 import AppTest\n"
+        f"AppTest.from_file({os.path.join(RAIZ, 'app.py')!r}, default_timeout=120).run()"
+    ),
+}
+
+MOLDE = """import time
+_t0 = time.perf_counter()
+{codigo}
+print(time.perf_counter() - _t0)
+"""
+
+
+def _pasta_trabalho():
+    # Cópia descartável dos dados: o banco é migrado do CSV do zero a cada rodada
+    pasta = tempfile.mkdtemp(prefix="fantini_bench_")
+    shutil.copy(os.path.join(RAIZ, "banco_produtos_dinamico.csv"), pasta)
+    shutil.copytree(os.path.join(RAIZ, "static"), os.path.join(pasta, "static"),
+                    ignore=shutil.ignore_patterns("_miniaturas"))
+    return pasta
+
+
+def medir(codigo, repeticoes):
+    amostras, processo = [], []
+    env = ambiente()
+    for _ in range(repeticoes):
+        pasta = _pasta_trabalho()
+        try:
+            t0 = time.perf_counter()
+            r = subprocess.run([sys.executable, "-c", MOLDE.format(codigo=codigo)], cwd=pasta, env=env,
+                               capture_output=True, text=True)
+            processo.append(time.perf_counter() - t0)
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+        if r.returncode != 0: return {"erro": erro(r)}
+        amostras.append(float(r.stdout.strip().splitlines()[-1]))
+    return {
+        "mediana_s": round(statistics.median(amostras), 4),
+        "min_s": round(min(amostras), 4),
+        "processo_mediana_s": round(statistics.median(processo), 4),
+        "amostras_s": [round(a, 4) for a in amostras],
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", "--repeticoes", type=int, default=5)
+    argumento_saida(ap)
+    ap.add_argument("--so", nargs="*", choices=list(MEDIDAS), help="roda só estas medidas")
+    a = ap.parse_args(argv)
+
+    resultado = cabecalho("inicializacao", {"repeticoes": a.repeticoes})
+    for nome in a.so or MEDIDAS:
+        resultado["medidas"][nome] = m = medir(MEDIDAS[nome], a.repeticoes)
+        print(f"{nome:22s} " + (f"{m['mediana_s'] * 1000:9.1f} ms" if "erro" not in m else f"ERRO: {m['erro']}"),
+              file=sys.stderr)
+
+    gravar(resultado, a.saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Pico de memória do livro de preços (volumes) contra o PDF único, por tamanho de catálogo.
+
+Para cada tamanho gera um catálogo sintético numa pasta temporária (uma foto distinta a cada
+--produtos-por-foto produtos, como num catálogo real) e mede, cada modo num processo novo, o
+tempo e quanto o RSS subiu no pico durante a geração:
+  - pdf_unico: gerar_pdf_final com o catálogo inteiro (o documento todo na memória);
+  - livro: gerar_livro (volumes de --itens-por-volume gravados um a um no ZIP).
+O pico do livro deve ficar praticamente igual entre os tamanhos; o do PDF único cresce.
+
+Uso:
+    python benchmarks/livro.py [--tamanhos 1000 3000 10000] [--itens-por-volume 500] [--saida r.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from comum import RAIZ, argumento_saida, erro, gravar, resultado as cabecalho
+sys.path.insert(0, RAIZ)
+
+
+def _rss_mb():
+    # RSS atual (Linux); fora do Linux, o RSS máximo do processo
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+
+
+def medir_pico(fn, intervalo=0.01):
+    """(segundos, quanto o RSS subiu no pico durante `fn()`, em MB), amostrando a cada `intervalo`."""
+    base = pico = _rss_mb()
+    fim = threading.Event()
+
+    def amostrar():
+        nonlocal pico
+        while not fim.wait(intervalo): pico = max(pico, _rss_mb())
+    t = threading.Thread(target=amostrar, daemon=True)
+    t.start()
+    t0 = time.perf_counter()
+    try:
+        fn()
+    finally:
+        segundos = time.perf_counter() - t0
+        fim.set(); t.join()
+    return round(segundos, 3), round(max(pico, _rss_mb()) - base, 1)
+
+
+def medir_modo(modo, itens_por_volume):
+    """Roda um modo na pasta atual (processo filho) e devolve tempo e subida do RSS máximo."""
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from fantini import Armazenamento, CacheCatalogo, gerar_pdf_final
+    from fantini.livro import gerar_livro
+    banco = Armazenamento()
+    catalogo = CacheCatalogo(banco.versao, banco.carregar, compacto=True).obter()
+    df, indice = catalogo.df, catalogo.indice
+    if modo == "pdf_unico":
+        arquivo = "unico.pdf"
+
+        def gerar():
+            with open(arquivo, "wb") as f: f.write(bytes(gerar_pdf_final(df, "Bench", "", "VAREJO", indice)))
+    else:
+        arquivo = "livro.zip"
+
+        def gerar():
+            gerar_livro(df, "VAREJO", arquivo, indice, itens_por_volume=itens_por_volume)
+    segundos, pico = medir_pico(gerar)
+    return {"segundos": segundos, "pico_mb": pico, "arquivo_mb": round(os.path.getsize(arquivo) / 2 ** 20, 2)}
+
+
+def preparar(linhas, produtos_por_foto):
+    """Catálogo + miniaturas já geradas (o que se mede é a montagem, não o Pillow)."""
+    from gerar_catalogo import gerar_catalogo
+    from fantini import Armazenamento, IndiceCatalogo
+    from fantini.lote import carregar_imagens
+    gerar_catalogo(".", linhas, tabelas=2, imagens=max(1, linhas // produtos_por_foto))
+    df = Armazenamento().carregar()
+    carregar_imagens(df, IndiceCatalogo(df))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 3000, 10000])
+    ap.add_argument("--itens-por-volume", type=int, default=500)
+    ap.add_argument("--produtos-por-foto", type=int, default=2)
+    ap.add_argument("--sem-pdf-unico", action="store_true", help="só o livro (o PDF único é lento em catálogos grandes)")
+    argumento_saida(ap)
+    ap.add_argument("--interno", help=argparse.SUPPRESS)
+    a = ap.parse_args(argv)
+
+    if a.interno:
+        print(json.dumps(medir_modo(a.interno, a.itens_por_volume)))
+        return
+
+    resultado = cabecalho("livro", {"itens_por_volume": a.itens_por_volume, "produtos_por_foto": a.produtos_por_foto})
+    modos = ["livro"] if a.sem_pdf_unico else ["pdf_unico", "livro"]
+    inicial = os.getcwd()
+    for linhas in a.tamanhos:
+        pasta = tempfile.mkdtemp(prefix=f"fantini_livro_{linhas}_")
+        medidas = resultado["medidas"][str(linhas)] = {}
+        try:
+            os.chdir(pasta)
+            preparar(linhas, a.produtos_por_foto)
+            for modo in modos:
+                r = subprocess.run([sys.executable, os.path.abspath(__file__), "--interno", modo,
+                                    "--itens-por-volume", str(a.itens_por_volume)], capture_output=True, text=True)
+                medidas[modo] = json.loads(r.stdout) if r.returncode == 0 else {"erro": erro(r)}
+        finally:
+            os.chdir(inicial)
+            shutil.rmtree(pasta, ignore_errors=True)
+        print(f"{linhas:7d} linhas  " + "  ".join(
+            f"{k}: {v['segundos']:.2f}s, pico +{v['pico_mb']:.1f} MB" if "erro" not in v else f"{k}: ERRO {v['erro']}"
+            for k, v in medidas.items()), file=sys.stderr)
+
+    gravar(resultado, a.saida)
+
+
+if __name__ == "__main__":
+    main()
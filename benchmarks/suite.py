@@ -0,0 +1,161 @@
+"""Suíte de benchmarks sobre catálogos sintéticos (1k/10k/100k linhas por padrão).
+
+Mede carga do catálogo, filtro por fabricante, busca, salvar/excluir produto, o cálculo de
+preços do simulador e o gerar_pdf_final com 10/100/1000 itens. Cada tamanho roda num processo
+novo, numa pasta temporária com dados gerados por `gerar_catalogo.py` (mesma semente, mesmos
+dados). O resultado vai em JSON; com `--comparar` as medidas mais lentas que a base além da
+tolerância são marcadas como regressão (e o código de saída é 1).
+
+Uso:
+    python benchmarks/suite.py [--tamanhos 1000 10000 100000] [--tabelas 8] [--imagens 50]
+                               [-n 5] [--saida atual.json] [--comparar base.json] [--tolerancia 0.2]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from comum import RAIZ, ambiente, argumento_saida, erro, gravar, medir, resultado as cabecalho
+
+ITENS_PDF = (10, 100, 1000)
+BUSCAS = ["vinagre", "alcol", "balde 5l", "789", "detergente luva", "pano piso 30x50"]
+
+
+def rodar_tamanho(linhas, tabelas, imagens, repeticoes, semente):
+    """Roda todas as medidas de um tamanho na pasta atual (chamado no processo filho)."""
+    sys.path.insert(0, RAIZ)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from gerar_catalogo import gerar_catalogo, gerar_vendas
+    medidas = {}
+    t0 = time.perf_counter()
+    gerar_catalogo(".", linhas, tabelas, imagens, semente)
+    gerar_vendas(".", linhas, semente)
+    medidas["gerar_dados"] = {"mediana_s": round(time.perf_counter() - t0, 6)}
+
+    from fantini import Armazenamento, CacheCatalogo, calcular_precos, gerar_pdf_final
+    from fantini.busca import IndiceBusca
+    from fantini.precificacao import CuboPrecos, arrays_custo
+    from fantini.vendas import carregar_dados
+
+    t0 = time.perf_counter()
+    banco = Armazenamento()  # migra o CSV gerado para o SQLite
+    medidas["migrar_csv"] = {"mediana_s": round(time.perf_counter() - t0, 6)}
+
+    def carregar():
+        return CacheCatalogo(banco.versao, banco.carregar, compacto=True).obter()
+    medidas["carregar"] = medir(carregar, repeticoes)
+    cache = CacheCatalogo(banco.versao, banco.carregar, compacto=True)
+    catalogo = cache.obter()
+    df, indice = catalogo.df, catalogo.indice
+    tabela = [c for c in df.columns if c not in ("codigo", "barras", "nome", "imagem", "fabricante")][0]
+
+    medidas["filtro_fabricante"] = medir(lambda: df[df["fabricante"] == "Serve Sempre"], repeticoes)
+    medidas["busca_indice"] = medir(lambda: IndiceBusca.de_dataframe(df), max(1, repeticoes // 2))
+    busca = cache.busca()
+    medidas["busca_consultas"] = medir(lambda: [busca.buscar(t, limite=200) for t in BUSCAS], repeticoes)
+
+    contador = iter(range(10 ** 9))
+
+    def salvar():
+        linha = {"codigo": f"BENCH-{next(contador)}", "nome": "PRODUTO BENCH", "barras": "7890000000000",
+                 "fabricante": "Serve Sempre", "imagem": "", tabela: 9.99}
+        cache.aplicar_upsert(linha, banco.salvar_produto(linha))
+        return linha["codigo"]
+    criados = []
+    medidas["salvar_produto"] = medir(lambda: criados.append(salvar()), repeticoes)
+    medidas["excluir_produto"] = medir(
+        lambda: cache.aplicar_exclusao(criados[-1], banco.excluir_produto(criados.pop())), repeticoes)
+
+    vendas = carregar_dados()
+    medidas["vendas_calcular_precos"] = medir(lambda: calcular_precos(vendas, 5.6, 12.0, 35, True), repeticoes)
+    custo, usd = arrays_custo(vendas)
+    medidas["vendas_cubo_cenarios"] = medir(
+        lambda: CuboPrecos(custo, usd, [5.4, 5.5, 5.6, 5.7, 5.8], [25, 30, 35, 40, 45], 12.0), repeticoes)
+
+    catalogo = cache.obter()
+    for n in ITENS_PDF:
+        if n > len(catalogo): continue
+        itens = catalogo.df.head(n)
+        # Aquecimento gera as miniaturas; o que se mede é a montagem do PDF
+        medidas[f"pdf_{n}_itens"] = medir(lambda: gerar_pdf_final(itens, "Bench", "", tabela, catalogo.indice),
+                                          max(1, repeticoes if n < 1000 else repeticoes // 2), aquecer=True)
+    return medidas
+
+
+def _filho(linhas, a):
+    pasta = tempfile.mkdtemp(prefix=f"fantini_suite_{linhas}_")
+    cmd = [sys.executable, os.path.abspath(__file__), "--interno", str(linhas), "--tabelas", str(a.tabelas),
+           "--imagens", str(a.imagens), "-n", str(a.repeticoes), "--semente", str(a.semente)]
+    try:
+        r = subprocess.run(cmd, cwd=pasta, env=ambiente(), capture_output=True, text=True)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    if r.returncode != 0: return {"erro": erro(r)}
+    return json.loads(r.stdout)
+
+
+def comparar(atual, base, tolerancia, folga_s=0.001):
+    """Medidas cuja mediana piorou mais que `tolerancia` (0.2 = 20%) em relação à base.
+
+    Diferenças abaixo de `folga_s` não contam (ruído de medidas de microssegundos).
+    """
+    regressoes = []
+    for tam, medidas in atual["medidas"].items():
+        for nome, m in medidas.items():
+            b = base.get("medidas", {}).get(tam, {}).get(nome)
+            if not b or "mediana_s" not in b or "mediana_s" not in m or not b["mediana_s"]: continue
+            razao = m["mediana_s"] / b["mediana_s"]
+            if razao > 1 + tolerancia and m["mediana_s"] - b["mediana_s"] > folga_s:
+                regressoes.append({"tamanho": tam, "medida": nome, "base_s": b["mediana_s"],
+                                   "atual_s": m["mediana_s"], "razao": round(razao, 3)})
+    return regressoes
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--tabelas", type=int, default=8)
+    ap.add_argument("--imagens", type=int, default=50)
+    ap.add_argument("-n", "--repeticoes", type=int, default=5)
+    ap.add_argument("--semente", type=int, default=42)
+    argumento_saida(ap)
+    ap.add_argument("--comparar", metavar="BASE.json", help="resultado anterior para marcar regressões")
+    ap.add_argument("--tolerancia", type=float, default=0.2, help="piora aceita antes de marcar (0.2 = 20%%)")
+    ap.add_argument("--folga-ms", type=float, default=1.0, help="diferença mínima para marcar regressão")
+    ap.add_argument("--interno", type=int, help=argparse.SUPPRESS)
+    a = ap.parse_args(argv)
+
+    if a.interno:
+        print(json.dumps(rodar_tamanho(a.interno, a.tabelas, a.imagens, a.repeticoes, a.semente)))
+        return 0
+
+    resultado = cabecalho("suite", {"tabelas": a.tabelas, "imagens": a.imagens, "repeticoes": a.repeticoes,
+                                    "semente": a.semente})
+    for linhas in a.tamanhos:
+        print(f"--- {linhas} linhas", file=sys.stderr)
+        resultado["medidas"][str(linhas)] = medidas = _filho(linhas, a)
+        if "erro" in medidas:
+            print(f"  ERRO: {medidas['erro']}", file=sys.stderr); continue
+        for nome, m in medidas.items():
+            print(f"  {nome:24s} {m['mediana_s'] * 1000:10.2f} ms", file=sys.stderr)
+
+    status = 0
+    if a.comparar:
+        with open(a.comparar, encoding="utf-8") as f: base = json.load(f)
+        resultado["base"] = {"arquivo": a.comparar, "commit": base.get("commit"), "tolerancia": a.tolerancia,
+                             "folga_ms": a.folga_ms}
+        resultado["regressoes"] = regressoes = comparar(resultado, base, a.tolerancia, a.folga_ms / 1000)
+        for r in regressoes:
+            print(f"REGRESSÃO {r['tamanho']}/{r['medida']}: {r['base_s'] * 1000:.2f} → {r['atual_s'] * 1000:.2f} ms "
+                  f"({r['razao']:.2f}x)", file=sys.stderr)
+        status = 1 if regressoes else 0
+
+    gravar(resultado, a.saida)
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,36 @@
+"""Núcleo do Sistema Fantini: catálogo, preços e PDF, sem depender do Streamlit.
+
+Os nomes abaixo são carregados no primeiro acesso, então `import fantini` não traz
+pandas, fpdf nem Pillow; o fpdf só é importado quando um PDF é de fato gerado.
+"""
+import importlib
+
+EMPRESAS = ["Vinagre Belmont", "Serve Sempre"]
+
+_EXPORTS = {
+    "PASTA_IMAGENS": "catalogo",
+    "IndiceCatalogo": "catalogo",
+    "versao_arquivo": "catalogo",
+    "Armazenamento": "armazenamento",
+    "COLUNAS_FIXAS": "armazenamento",
+    "ConflitoVersao": "armazenamento",
+    "Catalogo": "cache_catalogo",
+    "CacheCatalogo": "cache_catalogo",
+    "miniatura": "miniaturas",
+    "CachePDF": "cache_pdf",
+    "PDF": "pdf",
+    "gerar_pdf_final": "pdf",
+    "gerar_livro": "livro",
+    "calcular_precos": "precificacao",
+}
+
+__all__ = ["EMPRESAS", *_EXPORTS]
+
+
+def __getattr__(nome):
+    modulo = _EXPORTS.get(nome)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valor = getattr(importlib.import_module(f".{modulo}", __name__), nome)
+    globals()[nome] = valor
+    return valor
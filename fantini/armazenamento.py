@@ -0,0 +1,370 @@
+import os
+import json
+import sqlite3
+import threading
+from itertools import groupby
+from contextlib import contextmanager
+from .regras import MotorRegras, Regra, ordenar
+
+ARQUIVO_BANCO = "banco_produtos.db"
+ARQUIVO_CSV = "banco_produtos_dinamico.csv"  # formato antigo: migrado uma vez e usado na exportação
+COLUNAS_FIXAS = ["codigo", "barras", "nome", "imagem", "fabricante"]
+LINHAS_POR_GRAVACAO = 5000  # lote(): linhas lidas da tabela temporária por vez
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor);
+CREATE TABLE IF NOT EXISTS produtos (
+    codigo TEXT PRIMARY KEY,
+    barras TEXT,
+    nome TEXT NOT NULL,
+    imagem TEXT,
+    fabricante TEXT,
+    versao INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS produtos_imagem ON produtos(imagem);
+CREATE TABLE IF NOT EXISTS tabelas (nome TEXT PRIMARY KEY, ordem INTEGER NOT NULL);
+-- Só preços diferentes de zero são gravados; ausência = 0.0
+CREATE TABLE IF NOT EXISTS precos (
+    codigo TEXT NOT NULL REFERENCES produtos(codigo) ON DELETE CASCADE,
+    tabela TEXT NOT NULL REFERENCES tabelas(nome) ON DELETE CASCADE,
+    valor REAL NOT NULL,
+    PRIMARY KEY (codigo, tabela)
+) WITHOUT ROWID;
+-- Lápides: versão em que cada código foi excluído (edições baseadas em versões anteriores são conflito)
+CREATE TABLE IF NOT EXISTS excluidos (codigo TEXT PRIMARY KEY, versao INTEGER NOT NULL) WITHOUT ROWID;
+-- Tabelas calculadas: guardam só a regra; os valores são derivados na leitura
+CREATE TABLE IF NOT EXISTS regras (
+    tabela TEXT PRIMARY KEY REFERENCES tabelas(nome) ON DELETE CASCADE,
+    base TEXT NOT NULL REFERENCES tabelas(nome),
+    fator REAL NOT NULL,
+    arredondamento TEXT NOT NULL DEFAULT ''
+);
+INSERT OR IGNORE INTO meta (chave, valor) VALUES ('versao', 0);
+"""
+
+
+def _texto(v):
+    if v is None: return ""
+    s = str(v)
+    return "" if s == "nan" else s
+
+
+def _preco(v):
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if v != v else v  # NaN -> 0.0
+
+
+class ConflitoVersao(ValueError):
+    """O produto mudou (ou foi excluído) depois da versão do catálogo em que a escrita se baseou."""
+
+    def __init__(self, codigo, base, versao, excluido=False):
+        self.codigo, self.base, self.versao, self.excluido = codigo, base, versao, excluido
+        acao = "excluído" if excluido else "alterado"
+        super().__init__(f"Produto {codigo} foi {acao} por outra sessão (versão {versao}) "
+                         f"depois que esta edição começou (versão {base}).")
+
+
+class Armazenamento:
+    """Catálogo em SQLite: upsert/exclusão por linha, commits atômicos e contador de versão.
+
+    As escritas de produto aceitam `base`, a versão do catálogo que a sessão tinha ao começar a
+    editar: se o produto foi alterado ou excluído depois dela, levantam ConflitoVersao em vez de
+    sobrescrever (concorrência otimista; só a própria linha é conferida, na mesma transação).
+    """
+
+    def __init__(self, caminho=ARQUIVO_BANCO, csv_legado=ARQUIVO_CSV):
+        self.caminho = caminho
+        self._local = threading.local()
+        con = self._conexao()
+        con.executescript(ESQUEMA)
+        if csv_legado and os.path.exists(csv_legado) and self._meta("migrado_de") is None:
+            self.importar_csv(csv_legado)
+
+    # --- conexão / transação ---
+    def _conexao(self):
+        # sqlite3 não compartilha conexões entre threads: uma por thread (sessão do Streamlit)
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")  # leitores não esperam os escritores
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            self._local.con = con
+        return con
+
+    @contextmanager
+    def _transacao(self):
+        con = self._conexao()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            yield con
+            con.execute("UPDATE meta SET valor = valor + 1 WHERE chave = 'versao'")
+            # Versão lida dentro da transação: é exatamente a que este commit cria
+            self._local.versao = int(con.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0])
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+    def _meta(self, chave):
+        r = self._conexao().execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return None if r is None else r[0]
+
+    def versao(self):
+        return int(self._meta("versao"))
+
+    def marca(self, chave):
+        """Valor de uma marca de migração em meta (None se ela ainda não rodou)."""
+        return self._meta(chave)
+
+    # --- leitura ---
+    def tabelas(self):
+        return [r[0] for r in self._conexao().execute("SELECT nome FROM tabelas ORDER BY ordem")]
+
+    def regras(self, con=None):
+        con = con or self._conexao()
+        return {t: Regra(t, b, f, a) for t, b, f, a in
+                con.execute("SELECT tabela, base, fator, arredondamento FROM regras")}
+
+    def _ler(self, con):
+        import pandas as pd
+        versao = int(con.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0])
+        tabelas = [r[0] for r in con.execute("SELECT nome FROM tabelas ORDER BY ordem")]
+        regras = self.regras(con)
+        df = pd.read_sql_query("SELECT codigo, barras, nome, imagem, fabricante FROM produtos ORDER BY rowid", con)
+        precos = pd.read_sql_query("SELECT codigo, tabela, valor FROM precos", con)
+        df["barras"] = df["barras"].fillna("")
+        if tabelas:
+            largo = precos.pivot(index="codigo", columns="tabela", values="valor")
+            largo = largo.reindex(index=df["codigo"], columns=tabelas).fillna(0.0)
+            df = pd.concat([df, pd.DataFrame(largo.to_numpy(), columns=tabelas)], axis=1)
+        df = MotorRegras(regras).recalcular(df)  # tabelas calculadas, em bloco
+        df.attrs["versao"] = versao
+        df.attrs["regras"] = regras
+        return df
+
+    def carregar(self):
+        """Catálogo no formato largo de sempre: COLUNAS_FIXAS + uma coluna por tabela de preço."""
+        con = self._conexao()
+        con.execute("BEGIN")  # leitura consistente (snapshot) de todas as tabelas
+        try:
+            return self._ler(con)
+        finally:
+            con.execute("COMMIT")
+
+    def chaves(self):
+        """Códigos cadastrados e o mapa EAN (só dígitos) -> código, sem montar o catálogo."""
+        codigos, por_barras = set(), {}
+        for cod, ean in self._conexao().execute("SELECT codigo, barras FROM produtos"):
+            codigos.add(cod)
+            ean = "".join(ch for ch in (ean or "") if ch.isdigit())
+            if ean: por_barras.setdefault(ean, cod)
+        return codigos, por_barras
+
+    def imagens_em_uso(self):
+        """Valores da coluna imagem -> quantos produtos usam cada um."""
+        return dict(self._conexao().execute(
+            "SELECT imagem, COUNT(*) FROM produtos WHERE COALESCE(imagem, '') <> '' GROUP BY imagem"))
+
+    def imagem_em_uso(self, nome):
+        """Algum produto usa a imagem `nome`? (consulta pelo índice, sem varrer o catálogo)"""
+        return self._conexao().execute("SELECT 1 FROM produtos WHERE imagem = ? LIMIT 1", (nome,)).fetchone() is not None
+
+    def obter(self, codigo):
+        con = self._conexao()
+        r = con.execute("SELECT codigo, barras, nome, imagem, fabricante FROM produtos WHERE codigo = ?",
+                        (str(codigo),)).fetchone()
+        if r is None: return None
+        item = dict(zip(COLUNAS_FIXAS, r))
+        item.update({t: 0.0 for t in self.tabelas()})
+        item.update(dict(con.execute("SELECT tabela, valor FROM precos WHERE codigo = ?", (str(codigo),))))
+        return MotorRegras(self.regras()).recalcular_linha(item)
+
+    # --- escrita (cada chamada é uma transação) ---
+    def _conferir(self, con, codigo, base):
+        # Versão da última escrita no código (ou da exclusão) contra a versão em que a sessão se baseou
+        if base is None: return
+        r = con.execute("SELECT versao FROM produtos WHERE codigo = ?", (codigo,)).fetchone()
+        if r is not None and r[0] > base: raise ConflitoVersao(codigo, base, r[0])
+        if r is None:
+            r = con.execute("SELECT versao FROM excluidos WHERE codigo = ?", (codigo,)).fetchone()
+            if r is not None and r[0] > base: raise ConflitoVersao(codigo, base, r[0], excluido=True)
+
+    def _tabelas_manuais(self, con):
+        return [r[0] for r in con.execute(
+            "SELECT nome FROM tabelas WHERE nome NOT IN (SELECT tabela FROM regras) ORDER BY ordem")]
+
+    def _gravar_linhas(self, con, linhas, tabelas):
+        versao = int(con.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0]) + 1
+        con.executemany(
+            """INSERT INTO produtos (codigo, barras, nome, imagem, fabricante, versao) VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(codigo) DO UPDATE SET barras = excluded.barras, nome = excluded.nome,
+               imagem = excluded.imagem, fabricante = excluded.fabricante, versao = excluded.versao""",
+            [(_texto(l["codigo"]), _texto(l.get("barras")), _texto(l.get("nome")), _texto(l.get("imagem")),
+              _texto(l.get("fabricante")) or "Geral", versao) for l in linhas])
+        con.executemany("DELETE FROM excluidos WHERE codigo = ?", [(_texto(l["codigo"]),) for l in linhas])
+        con.executemany("DELETE FROM precos WHERE codigo = ?", [(_texto(l["codigo"]),) for l in linhas])
+        con.executemany(
+            "INSERT INTO precos (codigo, tabela, valor) VALUES (?, ?, ?)",
+            [(_texto(l["codigo"]), t, _preco(l.get(t))) for l in linhas for t in tabelas if _preco(l.get(t))])
+
+    def _mesclar_linhas(self, con, linhas, colunas, tabelas):
+        # Como _gravar_linhas, mas só mexe nas colunas informadas e não apaga com valor vazio
+        versao = int(con.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0]) + 1
+        fixas = [c for c in COLUNAS_FIXAS[1:] if c in colunas]
+        atualiza = ", ".join([f"{c} = COALESCE(NULLIF(excluded.{c}, ''), produtos.{c})" for c in fixas]
+                             + ["versao = excluded.versao"])
+        con.executemany(
+            f"""INSERT INTO produtos (codigo, barras, nome, imagem, fabricante, versao) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(codigo) DO UPDATE SET {atualiza}""",
+            [(_texto(l["codigo"]), _texto(l.get("barras")), _texto(l.get("nome")), _texto(l.get("imagem")),
+              _texto(l.get("fabricante")) or "Geral", versao) for l in linhas])
+        con.executemany("DELETE FROM excluidos WHERE codigo = ?", [(_texto(l["codigo"]),) for l in linhas])
+        for t in [c for c in colunas if c in tabelas]:
+            valores = [(_texto(l["codigo"]), _preco(l.get(t))) for l in linhas]
+            con.executemany("INSERT OR REPLACE INTO precos (codigo, tabela, valor) VALUES (?, ?, ?)",
+                            [(c, t, v) for c, v in valores if v])
+            con.executemany("DELETE FROM precos WHERE codigo = ? AND tabela = ?", [(c, t) for c, v in valores if not v])
+
+    @contextmanager
+    def lote(self):
+        """Gravação em blocos (importação): tudo entra ou nada entra.
+
+        Entrega `gravar(linhas, colunas)`, que faz upsert só das `colunas` informadas. Os blocos
+        ficam numa tabela temporária desta conexão (sem travar o banco enquanto o arquivo é lido);
+        só na saída do `with` eles entram no catálogo, numa transação curta. Se o `with` terminar
+        com erro, nada é gravado.
+        """
+        con = self._conexao()
+        con.execute("DROP TABLE IF EXISTS temp.lote")
+        con.execute("CREATE TEMP TABLE lote (n INTEGER PRIMARY KEY, colunas TEXT NOT NULL, linha TEXT NOT NULL)")
+        try:
+            def gravar(linhas, colunas):
+                chave = json.dumps(list(colunas))
+                con.executemany("INSERT INTO temp.lote (colunas, linha) VALUES (?, ?)",
+                                [(chave, json.dumps({c: l.get(c) for c in colunas}, default=str)) for l in linhas])
+            yield gravar
+            with self._transacao() as con:
+                tabelas = set(self._tabelas_manuais(con))
+                cur = con.execute("SELECT colunas, linha FROM temp.lote ORDER BY n")
+                while True:
+                    parte = cur.fetchmany(LINHAS_POR_GRAVACAO)
+                    if not parte: break
+                    # Linhas seguidas com as mesmas colunas vão juntas para o upsert
+                    for chave, grupo in groupby(parte, key=lambda r: r[0]):
+                        self._mesclar_linhas(con, [json.loads(r[1]) for r in grupo], json.loads(chave), tabelas)
+        finally:
+            con.execute("DROP TABLE IF EXISTS temp.lote")
+
+    def salvar_produto(self, dados, base=None):
+        """Insere ou atualiza um produto (colunas fixas + preços). Retorna a nova versão.
+
+        Com `base`, levanta ConflitoVersao se o produto mudou depois dessa versão do catálogo.
+        """
+        with self._transacao() as con:
+            self._conferir(con, _texto(dados["codigo"]), base)
+            # Valores de tabelas calculadas que vierem em `dados` são ignorados
+            self._gravar_linhas(con, [dados], self._tabelas_manuais(con))
+        return self._local.versao
+
+    def excluir_produto(self, codigo, base=None):
+        with self._transacao() as con:
+            self._conferir(con, str(codigo), base)
+            if con.execute("DELETE FROM produtos WHERE codigo = ?", (str(codigo),)).rowcount:
+                con.execute("INSERT OR REPLACE INTO excluidos (codigo, versao) "
+                            "SELECT ?, valor + 1 FROM meta WHERE chave = 'versao'", (str(codigo),))
+        return self._local.versao
+
+    def trocar_imagens(self, trocas, marca=None):
+        """Aponta os produtos de cada imagem antiga para a nova ({antiga: nova}). Retorna a nova versão.
+
+        `marca`: chave gravada em meta na mesma transação (migração que só deve rodar uma vez).
+        """
+        with self._transacao() as con:
+            versao = int(con.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0]) + 1
+            con.executemany("UPDATE produtos SET imagem = ?, versao = ? WHERE imagem = ?",
+                            [(nova, versao, antiga) for antiga, nova in trocas.items()])
+            if marca: con.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (marca, versao))
+        return self._local.versao
+
+    def criar_tabela(self, nome):
+        with self._transacao() as con:
+            # Duas sessões criando a mesma tabela: a segunda recebe o aviso, não um erro do SQLite
+            if con.execute("SELECT 1 FROM tabelas WHERE nome = ?", (nome,)).fetchone() is not None:
+                raise ValueError(f"A tabela '{nome}' já existe.")
+            con.execute("INSERT INTO tabelas (nome, ordem) SELECT ?, COALESCE(MAX(ordem), 0) + 1 FROM tabelas",
+                        (nome,))
+        return self._local.versao
+
+    def apagar_tabela(self, nome):
+        with self._transacao() as con:
+            dep = [r[0] for r in con.execute("SELECT tabela FROM regras WHERE base = ?", (nome,))]
+            if dep: raise ValueError(f"'{nome}' é base de: {', '.join(dep)}. Remova essas regras antes.")
+            con.execute("DELETE FROM tabelas WHERE nome = ?", (nome,))
+        return self._local.versao
+
+    def definir_regra(self, tabela, base, fator, arredondamento=""):
+        """Cria (ou troca) a regra de uma tabela calculada; cria a tabela se ela ainda não existir."""
+        regra = Regra(tabela, base, fator, arredondamento)
+        with self._transacao() as con:
+            if con.execute("SELECT 1 FROM tabelas WHERE nome = ?", (base,)).fetchone() is None:
+                raise ValueError(f"tabela base inexistente: {base}")
+            regras = self.regras(con)
+            regras[tabela] = regra
+            ordenar(regras)  # recusa ciclos (A = B × …, B = A × …)
+            con.execute("INSERT OR IGNORE INTO tabelas (nome, ordem) "
+                        "SELECT ?, COALESCE(MAX(ordem), 0) + 1 FROM tabelas", (tabela,))
+            con.execute("INSERT OR REPLACE INTO regras (tabela, base, fator, arredondamento) VALUES (?, ?, ?, ?)",
+                        (tabela, base, regra.fator, arredondamento))
+            con.execute("DELETE FROM precos WHERE tabela = ?", (tabela,))
+        return self._local.versao
+
+    def remover_regra(self, tabela):
+        """A tabela deixa de ser calculada e passa a guardar os valores que tinha."""
+        with self._transacao() as con:
+            df = self._ler(con)
+            con.execute("DELETE FROM regras WHERE tabela = ?", (tabela,))
+            con.executemany("INSERT OR REPLACE INTO precos (codigo, tabela, valor) VALUES (?, ?, ?)",
+                            [(c, tabela, float(v)) for c, v in zip(df["codigo"], df[tabela]) if v])
+        return self._local.versao
+
+    # --- compatibilidade com o CSV ---
+    def importar_csv(self, caminho_csv):
+        # Migração única do banco_produtos_dinamico.csv (tudo numa transação)
+        import pandas as pd
+        df = pd.read_csv(caminho_csv, dtype={"codigo": str, "barras": str})
+        if "fabricante" not in df.columns: df["fabricante"] = "Geral"
+        tabelas = [c for c in df.columns if c not in COLUNAS_FIXAS]
+        with self._transacao() as con:
+            for t in tabelas:
+                con.execute("INSERT OR IGNORE INTO tabelas (nome, ordem) "
+                            "SELECT ?, COALESCE(MAX(ordem), 0) + 1 FROM tabelas", (t,))
+            self._gravar_linhas(con, df.to_dict("records"), self._tabelas_manuais(con))
+            con.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('migrado_de', ?)",
+                        (os.path.basename(caminho_csv),))
+
+    def exportar_csv(self, destino=None):
+        """Exporta no layout do banco_produtos_dinamico.csv. Sem destino, retorna os bytes."""
+        dados = self.carregar().to_csv(index=False)
+        if destino is None: return dados.encode("utf-8")
+        tmp = f"{destino}.tmp"
+        with open(tmp, "w", encoding="utf-8", newline="") as f: f.write(dados)
+        os.replace(tmp, destino)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Banco de produtos (SQLite)")
+    ap.add_argument("acao", choices=["exportar", "importar"])
+    ap.add_argument("csv", help="arquivo CSV de destino/origem")
+    ap.add_argument("--banco", default=ARQUIVO_BANCO)
+    a = ap.parse_args()
+    banco = Armazenamento(a.banco, csv_legado=None)
+    if a.acao == "exportar":
+        banco.exportar_csv(a.csv)
+    else:
+        banco.importar_csv(a.csv)
+    print(f"{a.acao}: ok (versão {banco.versao()})")
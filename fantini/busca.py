@@ -0,0 +1,145 @@
+import bisect
+import threading
+import unicodedata
+from collections import defaultdict
+
+# pesos de cada tipo de acerto por termo da busca
+PESO_CODIGO = 6.0     # código ou EAN começando com o termo
+PESO_EXATO = 3.0      # palavra inteira
+PESO_PREFIXO = 2.0    # começo de palavra
+PESO_APROXIMADO = 1.5  # trigramas em comum (erros de digitação), multiplicado pela similaridade
+SIMILARIDADE_MINIMA = 0.45
+
+
+def normalizar(texto):
+    s = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode().lower()
+    return "" if s == "nan" else s
+
+
+def palavras(texto):
+    return [p for p in "".join(ch if ch.isalnum() else " " for ch in normalizar(texto)).split() if p]
+
+
+def trigramas(palavra):
+    p = f" {palavra} "
+    return {p[i:i + 3] for i in range(len(p) - 2)}
+
+
+def _digitos(v):
+    return "".join(ch for ch in str(v or "") if ch.isdigit())
+
+
+class IndiceBusca:
+    """Busca por código, nome e EAN: prefixo, palavra e aproximada (trigramas), com ranking.
+
+    Atualizado linha a linha (`atualizar`/`remover`) em vez de reconstruído a cada gravação.
+    """
+
+    def __init__(self):
+        self._docs = {}                     # codigo -> (codigo normalizado, ean, palavras)
+        self._por_palavra = defaultdict(set)
+        self._por_trigrama = defaultdict(set)
+        self._palavras = []                 # ordenadas, para busca por prefixo com bisect
+        self._chaves = []                   # (código normalizado ou EAN, codigo), ordenadas
+        self._lock = threading.Lock()
+
+    @classmethod
+    def de_dataframe(cls, df):
+        ind = cls()
+        barras = df["barras"] if "barras" in df.columns else [""] * len(df)
+        for cod, nome, ean in zip(df["codigo"], df["nome"], barras):
+            ind._inserir(str(cod), nome, ean)
+        return ind
+
+    def __len__(self):
+        return len(self._docs)
+
+    # --- manutenção incremental ---
+    def _inserir(self, cod, nome, ean):
+        pals = set(palavras(nome)) | set(palavras(cod))
+        doc = (normalizar(cod), _digitos(ean), pals)
+        self._docs[cod] = doc
+        for chave in doc[:2]:
+            if chave: bisect.insort(self._chaves, (chave, cod))
+        for p in pals:
+            if not self._por_palavra[p]: bisect.insort(self._palavras, p)
+            self._por_palavra[p].add(cod)
+            for t in trigramas(p): self._por_trigrama[t].add(cod)
+
+    def _retirar(self, cod):
+        doc = self._docs.pop(cod, None)
+        if doc is None: return
+        for chave in doc[:2]:
+            i = bisect.bisect_left(self._chaves, (chave, cod))
+            if i < len(self._chaves) and self._chaves[i] == (chave, cod): del self._chaves[i]
+        for p in doc[2]:
+            docs = self._por_palavra.get(p)
+            if docs is None: continue
+            docs.discard(cod)
+            if not docs:
+                del self._por_palavra[p]
+                i = bisect.bisect_left(self._palavras, p)
+                if i < len(self._palavras) and self._palavras[i] == p: del self._palavras[i]
+            for t in trigramas(p):
+                s = self._por_trigrama.get(t)
+                if s is not None:
+                    s.discard(cod)
+                    if not s: del self._por_trigrama[t]
+
+    def atualizar(self, codigo, nome, barras=""):
+        with self._lock:
+            self._retirar(str(codigo))
+            self._inserir(str(codigo), nome, barras)
+
+    def remover(self, codigo):
+        with self._lock:
+            self._retirar(str(codigo))
+
+    # --- consulta ---
+    def _prefixo(self, termo):
+        i = bisect.bisect_left(self._palavras, termo)
+        while i < len(self._palavras) and self._palavras[i].startswith(termo):
+            yield self._palavras[i]
+            i += 1
+
+    def _chaves_com_prefixo(self, termo):
+        i = bisect.bisect_left(self._chaves, (termo, ""))
+        while i < len(self._chaves) and self._chaves[i][0].startswith(termo):
+            yield self._chaves[i][1]
+            i += 1
+
+    def buscar(self, consulta, limite=20):
+        """Códigos mais relevantes para `consulta`, do melhor para o pior."""
+        termos = palavras(consulta)
+        if not termos: return []
+        inteiro = normalizar(consulta).strip()
+        digitos = _digitos(consulta)
+        with self._lock:
+            pontos = defaultdict(float)
+            acertos = defaultdict(int)
+            # Código/EAN digitado (inteiro, com pontos e traços)
+            por_codigo = set(self._chaves_com_prefixo(inteiro))
+            if len(digitos) >= 4: por_codigo.update(self._chaves_com_prefixo(digitos))
+            for cod in por_codigo: pontos[cod] += PESO_CODIGO
+            for termo in termos:
+                melhor = {}
+                for cod in self._por_palavra.get(termo, ()):
+                    melhor[cod] = PESO_EXATO
+                for pal in self._prefixo(termo):
+                    for cod in self._por_palavra[pal]:
+                        melhor[cod] = max(melhor.get(cod, 0.0), PESO_PREFIXO)
+                if len(termo) >= 3:
+                    tris = trigramas(termo)
+                    comuns = defaultdict(int)
+                    for t in tris:
+                        for cod in self._por_trigrama.get(t, ()): comuns[cod] += 1
+                    for cod, n in comuns.items():
+                        sim = n / len(tris)
+                        if sim >= SIMILARIDADE_MINIMA:
+                            melhor[cod] = max(melhor.get(cod, 0.0), PESO_APROXIMADO * sim)
+                for cod, p in melhor.items():
+                    pontos[cod] += p
+                    acertos[cod] += 1
+        # Primeiro quem bate mais termos da busca; depois a pontuação
+        ordem = sorted(pontos, key=lambda c: (-acertos[c], -pontos[c], c))
+        return ordem[:limite]
@@ -0,0 +1,160 @@
+import threading
+from .busca import IndiceBusca
+from .catalogo import IndiceCatalogo
+from .memoria import compactar
+from .regras import MotorRegras
+from . import desempenho
+
+
+def _pandas():
+    import pandas as pd
+    # Com Copy-on-Write as cópias rasas entregues às sessões nunca alteram o catálogo compartilhado
+    if int(pd.__version__.split(".")[0]) < 3 and not pd.get_option("mode.copy_on_write"):
+        pd.set_option("mode.copy_on_write", True)
+    return pd
+
+
+class Catalogo:
+    """Um retrato imutável do catálogo numa versão."""
+
+    def __init__(self, df, versao, regras=None):
+        _pandas()
+        self._df = df
+        self.versao = versao
+        self.regras = dict(regras or {})  # tabelas calculadas: {tabela: Regra}
+        self._indice = None
+        self._lock = threading.Lock()
+
+    @property
+    def df(self):
+        # Visão rasa (sem copiar os dados): quem alterar recebe a própria cópia
+        return self._df.copy(deep=False)
+
+    @property
+    def indice(self):
+        if self._indice is None:
+            with self._lock:
+                if self._indice is None: self._indice = IndiceCatalogo(self._df, self.versao)
+        return self._indice
+
+    def __len__(self):
+        return len(self._df)
+
+
+class CacheCatalogo:
+    """Catálogo único por processo, recarregado só quando a versão da origem muda.
+
+    `versao_fn` deve ser barata (stat do arquivo, contador do banco); `carregar_fn`
+    é o parse completo, feito uma vez por versão para todas as sessões. Com `compacto`
+    o catálogo fica nos tipos de `memoria.compactar` (categorias, Arrow, preços esparsos).
+    """
+
+    def __init__(self, versao_fn, carregar_fn, compacto=False):
+        self.versao_fn = versao_fn
+        self.carregar_fn = carregar_fn
+        self.compacto = compacto
+        self._atual = None
+        self._busca = None  # índice de busca: mantido linha a linha junto com as escritas
+        self._lock = threading.Lock()
+        self.recargas = 0
+
+    def _catalogo(self, df, versao, regras=None):
+        if self.compacto:
+            df = compactar(df)
+        return Catalogo(df, versao, regras)
+
+    def obter(self):
+        versao = self.versao_fn()
+        atual = self._atual
+        if atual is not None and versao is not None and atual.versao == versao:
+            desempenho.contar("catalogo_cache_acerto")
+            return atual
+        with self._lock:
+            versao = self.versao_fn()
+            if self._atual is None or versao is None or self._atual.versao != versao:
+                df = self.carregar_fn()
+                if versao is None: versao = self.versao_fn()  # a origem pode ter sido criada agora
+                # O carregamento pode trazer a própria versão (leitura consistente do banco)
+                self._atual = self._catalogo(df, df.attrs.get("versao", versao), df.attrs.get("regras"))
+                self._busca = None
+                self.recargas += 1
+                desempenho.contar("catalogo_recarga")
+            return self._atual
+
+    def publicar(self, df, versao):
+        """Instala um catálogo já montado pela própria escrita, sem reler a origem."""
+        with self._lock:
+            self._atual = self._catalogo(df, versao)
+            self._busca = None
+            return self._atual
+
+    def busca(self):
+        """Índice de busca do catálogo atual (montado na primeira consulta)."""
+        atual = self.obter()
+        with self._lock:
+            if self._busca is None: self._busca = IndiceBusca.de_dataframe(atual._df)
+            return self._busca
+
+    def invalidar(self):
+        """Descarta o catálogo em memória (ex.: depois de uma importação em massa)."""
+        self._atual = None
+        self._busca = None
+
+    # --- aplicação de escritas por linha (evita o re-parse após cada gravação) ---
+    def _base(self, versao):
+        # Só dá para aplicar o delta se nenhuma outra escrita entrou no meio
+        atual = self._atual
+        if atual is None or not isinstance(versao, int) or atual.versao != versao - 1: return None
+        return atual
+
+    def aplicar_upsert(self, linha, versao):
+        with self._lock:
+            base = self._base(versao)
+            if base is None: self.invalidar(); return
+            pd = _pandas()
+            pos = base.indice.posicao(linha["codigo"])
+            valores = {c: linha.get(c, 0.0) for c in base._df.columns}
+            # Só esta linha tem as tabelas calculadas refeitas
+            if base.regras: MotorRegras(base.regras).recalcular_linha(valores)
+            if self._busca is not None: self._busca.atualizar(linha["codigo"], valores.get("nome"), valores.get("barras"))
+            # Categorias e colunas esparsas não aceitam atribuição célula a célula: a linha nova
+            # entra por concatenação (as demais colunas não são copiadas uma a uma)
+            nova = pd.DataFrame([valores], columns=base._df.columns)
+            if pos is not None:
+                df = pd.concat([base._df.iloc[:pos], nova, base._df.iloc[pos + 1:]], ignore_index=True)
+            else:
+                df = pd.concat([base._df, nova], ignore_index=True)
+            df.attrs["versao"] = versao
+            self._atual = self._catalogo(df, versao, base.regras)
+
+    def aplicar_exclusao(self, codigo, versao):
+        with self._lock:
+            base = self._base(versao)
+            if base is None: self.invalidar(); return
+            pos = base.indice.posicao(codigo)
+            if self._busca is not None: self._busca.remover(codigo)
+            df = base._df.copy(deep=False) if pos is None else base._df.drop(index=base._df.index[pos]).reset_index(drop=True)
+            df.attrs["versao"] = versao
+            self._atual = self._catalogo(df, versao, base.regras)
+
+    def aplicar_tabela(self, nome, versao, remover=False):
+        with self._lock:
+            base = self._base(versao)
+            if base is None: self.invalidar(); return
+            df = base._df.drop(columns=[nome]) if remover else base._df.assign(**{nome: 0.0})
+            df.attrs["versao"] = versao
+            self._atual = self._catalogo(df, versao, {t: r for t, r in base.regras.items() if t != nome})
+
+    def aplicar_regra(self, tabela, regra, versao):
+        """Nova regra (ou `None` para removê-la): só a coluna e as que dependem dela são recalculadas."""
+        with self._lock:
+            base = self._base(versao)
+            if base is None: self.invalidar(); return
+            regras = {t: r for t, r in base.regras.items() if t != tabela}
+            df = base._df if tabela in base._df.columns else base._df.assign(**{tabela: 0.0})
+            if regra is not None:
+                regras[tabela] = regra
+                df = MotorRegras(regras).recalcular(df, [tabela])
+            df = df.copy(deep=False)
+            df.attrs["versao"] = versao
+            self._atual = self._catalogo(df, versao, regras)
@@ -0,0 +1,42 @@
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from . import desempenho
+
+
+class CachePDF:
+    """LRU de PDFs gerados, compartilhado entre as sessões.
+
+    Cada entrada é um Future: a geração roda em segundo plano e quem pede a
+    mesma chave enquanto ela ainda está sendo montada recebe o mesmo Future.
+    """
+
+    def __init__(self, limite=32, workers=2):
+        self.limite = limite
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf")
+
+    def obter(self, chave, gerar, *args, **kwargs):
+        with self._lock:
+            futuro = self._itens.get(chave)
+            # Gerações que falharam são refeitas no próximo pedido
+            if futuro is not None and futuro.done() and futuro.exception() is not None:
+                futuro = None
+            desempenho.contar("pdf_cache_acerto" if futuro is not None else "pdf_cache_falta")
+            if futuro is None:
+                # A geração roda no contexto de quem pediu (medições vão para a sessão certa)
+                futuro = self._executor.submit(contextvars.copy_context().run, gerar, *args, **kwargs)
+                self._itens[chave] = futuro
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.limite:
+                self._itens.popitem(last=False)
+            return futuro
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+cache_pdf = CachePDF()
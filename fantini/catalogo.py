@@ -0,0 +1,71 @@
+import os
+
+PASTA_IMAGENS = "static"
+SEM_FOTO = "sem_foto.png"
+
+
+def versao_arquivo(caminho):
+    # Identifica a versão do catálogo pelo mtime + tamanho do arquivo
+    try:
+        st_ = os.stat(caminho)
+    except OSError:
+        return None
+    return (st_.st_mtime_ns, st_.st_size)
+
+
+def _chave(valor):
+    s = str(valor).strip()
+    return "" if s == "nan" else s
+
+
+def _chave_barras(valor):
+    # EAN é comparado só pelos dígitos ("789609050005-5" == "7896090500055")
+    return "".join(ch for ch in _chave(valor) if ch.isdigit())
+
+
+class IndiceCatalogo:
+    """Índice do catálogo por código e por EAN (barras), montado uma vez por versão."""
+
+    def __init__(self, df, versao=None, pasta_imagens=PASTA_IMAGENS):
+        self.df = df
+        self.versao = versao
+        self.pasta_imagens = pasta_imagens
+        self._por_codigo = {}
+        self._por_barras = {}
+        codigos = df["codigo"].tolist() if "codigo" in df.columns else []
+        barras = df["barras"].tolist() if "barras" in df.columns else [None] * len(codigos)
+        for pos, (cod, ean) in enumerate(zip(codigos, barras)):
+            self._por_codigo[_chave(cod)] = pos
+            k = _chave_barras(ean)
+            if k: self._por_barras.setdefault(k, pos)
+
+    def __len__(self):
+        return len(self._por_codigo)
+
+    def __contains__(self, codigo):
+        return _chave(codigo) in self._por_codigo
+
+    def posicao(self, codigo):
+        return self._por_codigo.get(_chave(codigo))
+
+    def linha(self, codigo):
+        pos = self.posicao(codigo)
+        return None if pos is None else self.df.iloc[pos]
+
+    def por_barras(self, ean):
+        pos = self._por_barras.get(_chave_barras(ean))
+        return None if pos is None else self.df.iloc[pos]
+
+    def caminho_imagem(self, codigo):
+        """Retorna (caminho, falta). `falta` descreve o motivo quando não há imagem utilizável."""
+        pos = self.posicao(codigo)
+        if pos is None:
+            return None, f"{codigo}: código não encontrado no catálogo"
+        nome_arq = _chave(self.df["imagem"].iat[pos]) if "imagem" in self.df.columns else ""
+        if not nome_arq or nome_arq == SEM_FOTO:
+            return None, None  # produto cadastrado sem foto: não é erro
+        caminho = os.path.join(self.pasta_imagens, nome_arq)
+        if not os.path.exists(caminho):
+            return None, f"{codigo}: imagem '{nome_arq}' não encontrada"
+        return caminho, None
+
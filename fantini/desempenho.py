@@ -0,0 +1,137 @@
+"""Medição de tempo por etapa e contadores (cache, bytes de imagem) por sessão.
+
+Cada sessão tem um `Coletor`, ligado à execução atual por `usar()` (contextvar). Sem coletor
+ligado, `etapa`, `cronometrar` e `contar` só consultam a contextvar e saem: custo desprezível.
+Ao fim de cada execução `fechar()` grava uma linha no log JSONL para análise posterior.
+
+Liga pelo painel "Desempenho" da barra lateral ou com FANTINI_DESEMPENHO=1.
+"""
+import os
+import json
+import time
+import threading
+import functools
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+ATIVO_PADRAO = os.environ.get("FANTINI_DESEMPENHO", "") not in ("", "0")
+ARQUIVO_LOG = os.environ.get("FANTINI_DESEMPENHO_LOG", "desempenho.jsonl")
+JANELA = 200  # execuções guardadas por etapa para o histograma da sessão
+
+_coletor = contextvars.ContextVar("fantini_coletor", default=None)
+_lock_log = threading.Lock()
+
+
+class Coletor:
+    """Tempos (janela das últimas execuções) e contadores de uma sessão."""
+
+    def __init__(self, app, sessao=None, arquivo_log=ARQUIVO_LOG, janela=JANELA):
+        self.app = app
+        self.sessao = sessao or f"{os.getpid()}-{id(self):x}"
+        self.arquivo_log = arquivo_log
+        self.tempos = defaultdict(lambda: deque(maxlen=janela))  # etapa -> segundos
+        self.contadores = defaultdict(int)                       # acumulado na sessão
+        self._execucao = {"etapas": defaultdict(float), "contadores": defaultdict(int)}
+        self._lock = threading.Lock()  # o PDF termina numa thread do pool
+
+    def registrar(self, nome, segundos):
+        with self._lock:
+            self.tempos[nome].append(segundos)
+            self._execucao["etapas"][nome] += segundos
+
+    def contar(self, nome, n=1):
+        with self._lock:
+            self.contadores[nome] += n
+            self._execucao["contadores"][nome] += n
+
+    def resumo(self):
+        """Por etapa: n, média, p50, p95 e última medição (ms)."""
+        import numpy as np
+        with self._lock:
+            tempos = {k: np.array(v) * 1000 for k, v in self.tempos.items() if v}
+        return [{"etapa": k, "n": len(v), "media_ms": float(v.mean()), "p50_ms": float(np.percentile(v, 50)),
+                 "p95_ms": float(np.percentile(v, 95)), "ultima_ms": float(v[-1])} for k, v in sorted(tempos.items())]
+
+    def histograma(self, nome, faixas=12):
+        """(contagens, limites em ms) das medições guardadas de `nome` (a ordem do np.histogram)."""
+        import numpy as np
+        with self._lock:
+            v = np.array(self.tempos.get(nome, ())) * 1000
+        return np.histogram(v, bins=faixas) if len(v) else (np.array([]), np.array([]))
+
+    def fechar(self):
+        """Grava a execução atual (uma linha JSON) e começa a próxima."""
+        with self._lock:
+            execucao, self._execucao = self._execucao, {"etapas": defaultdict(float), "contadores": defaultdict(int)}
+        if not self.arquivo_log or not (execucao["etapas"] or execucao["contadores"]): return
+        linha = {"ts": round(time.time(), 3), "app": self.app, "sessao": self.sessao,
+                 "etapas_ms": {k: round(v * 1000, 3) for k, v in execucao["etapas"].items()},
+                 "contadores": dict(execucao["contadores"])}
+        with _lock_log, open(self.arquivo_log, "a", encoding="utf-8") as f:
+            f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+
+
+def usar(coletor):
+    """Liga `coletor` (ou None para desligar) à execução atual e ao que ela disparar."""
+    _coletor.set(coletor)
+
+
+def atual():
+    return _coletor.get()
+
+
+@contextmanager
+def etapa(nome):
+    c = _coletor.get()
+    if c is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        c.registrar(nome, time.perf_counter() - t0)
+
+
+def cronometrar(nome=None):
+    """Decorador: mede cada chamada como a etapa `nome` (padrão: nome da função)."""
+    def decorar(fn):
+        rotulo = nome or fn.__name__
+
+        @functools.wraps(fn)
+        def medido(*args, **kwargs):
+            c = _coletor.get()
+            if c is None: return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                c.registrar(rotulo, time.perf_counter() - t0)
+        return medido
+    return decorar
+
+
+def contar(nome, n=1):
+    c = _coletor.get()
+    if c is not None: c.contar(nome, n)
+
+
+def painel(coletor, titulo="⏱️ Desempenho"):
+    """Painel da barra lateral (Streamlit): percentis por etapa, contadores e histograma."""
+    import pandas as pd
+    import streamlit as st
+    with st.sidebar.expander(titulo, expanded=True):
+        linhas = coletor.resumo()
+        if not linhas:
+            st.caption("Sem medições ainda."); return
+        st.dataframe(linhas, hide_index=True, use_container_width=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.1f")
+                                    for c in ("media_ms", "p50_ms", "p95_ms", "ultima_ms")})
+        if coletor.contadores: st.json(dict(coletor.contadores), expanded=False)
+        nome = st.selectbox("Histograma da etapa:", [l["etapa"] for l in linhas], key="desempenho_etapa")
+        contagens, limites = coletor.histograma(nome)
+        # Eixo numérico (centro de cada faixa): faixas abaixo de 1 ms não viram o mesmo rótulo
+        st.bar_chart(pd.DataFrame({"ms": (limites[:-1] + limites[1:]) / 2, "execuções": contagens}),
+                     x="ms", y="execuções")
+        st.caption(f"Log: {coletor.arquivo_log}")
@@ -0,0 +1,170 @@
+"""Fotos dos produtos guardadas pelo conteúdo (sha1): a mesma imagem existe uma vez só.
+
+O produto aponta para `imagens/<sha1>.<ext>` (relativo a static/). Arquivos que nenhum
+produto usa são removidos por `coletar`; `migrar` converte a pasta static/ do formato antigo
+(`<codigo>_<nome do arquivo>`, uma cópia por upload).
+
+Uso:
+    python -m fantini.imagens migrar|limpar [--simular] [--banco banco_produtos.db]
+"""
+import os
+import re
+import time
+import hashlib
+import argparse
+import threading
+from .catalogo import PASTA_IMAGENS, SEM_FOTO
+
+SUBPASTA = "imagens"
+EXTENSOES = {".png": ".png", ".jpg": ".jpg", ".jpeg": ".jpg"}
+# Arquivo recém-gravado ainda pode estar a caminho do banco (upload antes do "Salvar")
+IDADE_MINIMA_COLETA = 3600
+# Padrão dos uploads antigos: "<codigo>_<nome original>.png"
+_LEGADO = re.compile(r"^[^_/\\]+_.+\.(png|jpe?g)$", re.IGNORECASE)
+_ARQUIVO = re.compile(r"^[0-9a-f]{40}\.(png|jpg)$")
+MARCA_MIGRACAO = "imagens_migradas"  # chave em meta: a migração já rodou neste banco
+
+
+def _extensao(nome):
+    return EXTENSOES.get(os.path.splitext(str(nome))[1].lower(), ".png")
+
+
+def eh_do_acervo(nome):
+    """`nome` (coluna imagem) aponta para o acervo por conteúdo?"""
+    pasta, arq = os.path.split(str(nome or "").replace("\\", "/"))
+    return pasta == SUBPASTA and bool(_ARQUIVO.match(arq))
+
+
+def hash_do_nome(nome):
+    # O nome do arquivo já é o sha1 do conteúdo: não precisa reler o arquivo
+    arq = os.path.basename(str(nome))
+    return arq[:40] if _ARQUIVO.match(arq) else None
+
+
+def guardar(dados, nome_original="", pasta=PASTA_IMAGENS):
+    """Grava os bytes no acervo (se ainda não estiverem lá) e retorna o valor da coluna imagem."""
+    nome = f"{SUBPASTA}/{hashlib.sha1(dados).hexdigest()}{_extensao(nome_original)}"
+    destino = os.path.join(pasta, nome)
+    if os.path.exists(destino):
+        os.utime(destino)  # reaproveitada agora: fica fora da próxima coleta
+        return nome
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"  # sessões são threads do mesmo processo
+    with open(tmp, "wb") as f: f.write(dados)
+    os.replace(tmp, destino)
+    return nome
+
+
+def _remover(pasta, nome):
+    try:
+        os.remove(os.path.join(pasta, nome))
+    except OSError:
+        return
+    # As miniaturas derivadas desse conteúdo também não servem mais
+    from .miniaturas import PASTA_CACHE
+    h = hash_do_nome(nome)
+    if h and os.path.isdir(PASTA_CACHE):
+        for e in os.scandir(PASTA_CACHE):
+            if e.name.startswith(h + "_"):
+                try:
+                    os.remove(e.path)
+                except OSError:
+                    pass
+
+
+def coletar(banco, pasta=PASTA_IMAGENS, simular=False, idade_minima=IDADE_MINIMA_COLETA):
+    """Remove do acervo os arquivos que nenhum produto referencia. Retorna os nomes removidos.
+
+    Só entram arquivos sem uso há mais de `idade_minima` segundos: `guardar` renova a data do
+    arquivo, então a foto que uma sessão acabou de enviar (e ainda não salvou) não some.
+    """
+    acervo = os.path.join(pasta, SUBPASTA)
+    if not os.path.isdir(acervo): return []
+    em_uso = banco.imagens_em_uso()
+    limite = time.time() - idade_minima
+    orfas = [f"{SUBPASTA}/{e.name}" for e in os.scandir(acervo)
+             if e.is_file() and _ARQUIVO.match(e.name) and e.stat().st_mtime < limite]
+    orfas = [n for n in orfas if n not in em_uso]
+    if simular: return orfas
+    removidas = []
+    for n in orfas:
+        # Confere de novo, arquivo a arquivo: alguém pode ter reaproveitado a foto durante a varredura
+        try:
+            if os.stat(os.path.join(pasta, n)).st_mtime >= limite or banco.imagem_em_uso(n): continue
+        except OSError:
+            continue
+        _remover(pasta, n)
+        removidas.append(n)
+    return removidas
+
+
+def migrar(banco, pasta=PASTA_IMAGENS, simular=False, forcar=False):
+    """Passa as fotos antigas de static/ para o acervo, troca a coluna imagem e apaga as cópias.
+
+    Roda uma vez só por banco (marca MARCA_MIGRACAO em meta, como o migrado_de do CSV); `forcar`
+    ignora a marca (linha de comando). Entram os arquivos que a coluna imagem referencia e todos
+    os uploads antigos (`<codigo>_<nome>`), usados ou não: cada conteúdo fica uma vez só no
+    acervo e as cópias somem. O upload que nenhum produto usa vai para o acervo como órfão e sai
+    na próxima `coletar`, passada a carência. Logos e banners (fora do padrão) não são tocados.
+    Retorna as contagens.
+    """
+    rel = {"arquivos": 0, "produtos": 0, "unicos": 0, "sem_uso": 0, "apagados": 0, "bytes_liberados": 0,
+           "simulado": simular, "ja_migrado": False}
+    if not forcar and banco.marca(MARCA_MIGRACAO) is not None:
+        rel["ja_migrado"] = True
+        return rel
+    em_uso = banco.imagens_em_uso()
+    referenciados = {n for n in em_uso if not eh_do_acervo(n) and n != SEM_FOTO
+                     and os.path.isfile(os.path.join(pasta, n))}
+    legados = {e.name for e in os.scandir(pasta) if e.is_file() and _LEGADO.match(e.name)} \
+        if os.path.isdir(pasta) else set()
+    rel.update(arquivos=len(referenciados | legados), sem_uso=len(legados - referenciados))
+
+    novos, liberados = {}, 0
+    for nome in sorted(referenciados | legados):
+        with open(os.path.join(pasta, nome), "rb") as f: dados = f.read()
+        novo = f"{SUBPASTA}/{hashlib.sha1(dados).hexdigest()}{_extensao(nome)}"
+        # Cada conteúdo fica com uma cópia (a do acervo); as demais são espaço liberado
+        liberados += len(dados) if novo in novos.values() or os.path.exists(os.path.join(pasta, novo)) else 0
+        if not simular: guardar(dados, nome, pasta)
+        novos[nome] = novo
+    trocas = {n: novos[n] for n in referenciados}
+    copias = [n for n in novos if _LEGADO.match(os.path.basename(n))]
+    rel.update(unicos=len(set(novos.values())), bytes_liberados=liberados,
+               produtos=sum(em_uso[n] for n in trocas))
+    if simular:
+        rel["apagados"] = len(copias)
+        return rel
+    # Primeiro o banco aponta para o acervo (e grava a marca); só então as cópias antigas somem
+    banco.trocar_imagens(trocas, marca=MARCA_MIGRACAO)
+    for nome in copias:
+        try:
+            os.remove(os.path.join(pasta, nome)); rel["apagados"] += 1
+        except OSError:
+            pass
+    return rel
+
+
+def main(argv=None):
+    from .armazenamento import Armazenamento, ARQUIVO_BANCO
+    ap = argparse.ArgumentParser(description="Acervo de imagens dos produtos")
+    ap.add_argument("acao", choices=["migrar", "limpar"])
+    ap.add_argument("--simular", action="store_true", help="só mostra o que seria feito")
+    ap.add_argument("--banco", default=ARQUIVO_BANCO)
+    ap.add_argument("--pasta", default=PASTA_IMAGENS)
+    a = ap.parse_args(argv)
+    banco = Armazenamento(a.banco)
+    if a.acao == "migrar":
+        rel = migrar(banco, a.pasta, simular=a.simular, forcar=True)
+        print(f"Arquivos antigos: {rel['arquivos']}  Imagens únicas: {rel['unicos']}  "
+              f"Produtos atualizados: {rel['produtos']}  Sem uso: {rel['sem_uso']}  Apagados: {rel['apagados']}  "
+              f"Liberado: {rel['bytes_liberados'] / 1024:.0f} KB" + ("  (simulação)" if a.simular else ""))
+    else:
+        orfas = coletar(banco, a.pasta, simular=a.simular)
+        for n in orfas: print(f"  - {n}")
+        print(f"{len(orfas)} imagens sem uso " + ("encontradas (simulação)" if a.simular else "removidas"))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
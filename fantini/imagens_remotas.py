@@ -0,0 +1,193 @@
+"""Cópias locais (reduzidas) das fotos remotas do simulador, baixadas em segundo plano.
+
+As URLs do catálogo são baixadas por um pool de threads com concorrência limitada, timeout
+e novas tentativas (com espera crescente). Cada foto vira um JPEG pequeno em
+static/_remotas, servido pelo próprio Streamlit; depois do TTL a cópia é revalidada com
+If-None-Match/If-Modified-Since (304 = só renova o prazo). O cache tem limite de tamanho
+e descarta primeiro o que foi verificado há mais tempo (o que a vitrine ainda mostra é
+revalidado a cada TTL, então fica). A URL descartada fica marcada no índice e só volta a ser
+baixada depois do TTL: sem isso, com mais fotos do que cabem no limite, cada rerun baixaria
+de novo o que acabou de sair (e derrubaria outras).
+"""
+import io
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+import contextvars
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from . import desempenho
+
+PASTA_REMOTAS = os.path.join("static", "_remotas")
+LIMITE_BYTES = int(os.environ.get("FANTINI_CACHE_REMOTAS_MB", "128")) * 1024 * 1024
+TTL = int(os.environ.get("FANTINI_REMOTAS_TTL", str(24 * 3600)))  # segundos até revalidar
+LADO = 200
+AGENTE = "FantiniSistema/1.0"
+# Falhas que valem nova tentativa (o resto, como 404, é definitivo até o próximo TTL)
+STATUS_TEMPORARIO = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CacheImagensRemotas:
+    """Baixa, reduz e guarda as fotos remotas; `local(url)` diz onde está a cópia (ou None)."""
+
+    def __init__(self, pasta=PASTA_REMOTAS, workers=8, timeout=5.0, tentativas=3, ttl=TTL,
+                 limite_bytes=LIMITE_BYTES, espera_base=0.5):
+        self.pasta = pasta
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.ttl = ttl
+        self.limite_bytes = limite_bytes
+        self.espera_base = espera_base
+        self._arquivo_indice = os.path.join(pasta, "indice.json")
+        self._indice = self._ler_indice()   # url -> {arquivo, etag, modificado, verificado, bytes, erro, despejada}
+        self._andamento = {}                # url -> Future
+        self._total_bytes = sum(i.get("bytes", 0) for i in self._indice.values())
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="remotas")
+        self.estatisticas = {"baixadas": 0, "revalidadas": 0, "tentativas_extras": 0, "falhas": 0,
+                             "despejadas": 0}
+
+    # --- índice em disco ---
+    def _ler_indice(self):
+        try:
+            with open(self._arquivo_indice, encoding="utf-8") as f: return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def salvar_indice(self):
+        with self._lock:
+            dados = json.dumps(self._indice)
+        os.makedirs(self.pasta, exist_ok=True)
+        tmp = f"{self._arquivo_indice}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: f.write(dados)
+        os.replace(tmp, self._arquivo_indice)
+
+    # --- consulta ---
+    def local(self, url):
+        """Caminho da cópia local de `url`, se já houver uma."""
+        info = self._indice.get(url)
+        if not info or not info.get("arquivo"): return None
+        caminho = os.path.join(self.pasta, info["arquivo"])
+        return caminho if os.path.exists(caminho) else None
+
+    def prontas(self, urls):
+        return sum(1 for u in set(urls) if self.local(u))
+
+    def _fresca(self, info, agora):
+        return info is not None and agora - info.get("verificado", 0) < self.ttl
+
+    # --- download ---
+    def prefetch(self, urls):
+        """Agenda (sem bloquear) o download das URLs que não estão frescas no cache.
+
+        Retorna os Futures agendados agora; URLs já em andamento não são repetidas.
+        """
+        agora = time.time()
+        futuros = []
+        with self._lock:
+            for url in dict.fromkeys(u for u in urls if isinstance(u, str) and u.startswith(("http://", "https://"))):
+                if url in self._andamento or self._fresca(self._indice.get(url), agora): continue
+                futuro = self._executor.submit(contextvars.copy_context().run, self._buscar, url)
+                self._andamento[url] = futuro
+                futuros.append(futuro)
+        if futuros: desempenho.contar("remotas_agendadas", len(futuros))
+        return futuros
+
+    def aguardar(self, urls, timeout=None):
+        """Baixa as URLs e espera terminarem (uso fora da tela: lote, benchmarks)."""
+        self.prefetch(urls)
+        with self._lock:
+            futuros = [self._andamento[u] for u in set(urls) if u in self._andamento]
+        for f in futuros: f.result(timeout)
+        self.salvar_indice()
+
+    def _requisicao(self, url, info):
+        cabecalhos = {"User-Agent": AGENTE}
+        if info and self.local(url):
+            if info.get("etag"): cabecalhos["If-None-Match"] = info["etag"]
+            if info.get("modificado"): cabecalhos["If-Modified-Since"] = info["modificado"]
+        return urllib.request.Request(url, headers=cabecalhos)
+
+    def _buscar(self, url):
+        try:
+            info = self._indice.get(url)
+            for tentativa in range(self.tentativas):
+                if tentativa:
+                    self._contar("tentativas_extras")
+                    time.sleep(self.espera_base * 2 ** (tentativa - 1) * (0.5 + random.random()))
+                try:
+                    with urllib.request.urlopen(self._requisicao(url, info), timeout=self.timeout) as r:
+                        dados = r.read()
+                        etag, modificado = r.headers.get("ETag"), r.headers.get("Last-Modified")
+                except urllib.error.HTTPError as e:
+                    if e.code == 304 and info:
+                        with self._lock: self._indice[url] = dict(info, verificado=time.time(), erro=None)
+                        self._contar("revalidadas")
+                        return "revalidada"
+                    if e.code in STATUS_TEMPORARIO and tentativa + 1 < self.tentativas: continue
+                    return self._falhou(url, info, f"HTTP {e.code}")
+                except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                    if tentativa + 1 < self.tentativas: continue
+                    return self._falhou(url, info, str(getattr(e, "reason", e)))
+                return self._gravar(url, dados, etag, modificado)
+        finally:
+            with self._lock:
+                self._andamento.pop(url, None)
+                ocioso = not self._andamento
+            if ocioso: self.salvar_indice()  # grava o índice uma vez por leva, não a cada foto
+
+    def _falhou(self, url, info, motivo):
+        # A cópia antiga (se houver) continua valendo; a URL só é tentada de novo após o TTL
+        self._contar("falhas")
+        with self._lock: self._indice[url] = dict(info or {}, verificado=time.time(), erro=motivo)
+        return "falha"
+
+    def _gravar(self, url, dados, etag, modificado):
+        from PIL import Image
+        from .miniaturas import _gerar
+        arquivo = hashlib.sha1(url.encode("utf-8")).hexdigest() + ".jpg"
+        destino = os.path.join(self.pasta, arquivo)
+        os.makedirs(self.pasta, exist_ok=True)
+        try:
+            _gerar(io.BytesIO(dados), destino, LADO)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            return self._falhou(url, self._indice.get(url), f"imagem inválida: {e}")
+        tamanho = os.path.getsize(destino)
+        with self._lock:
+            anterior = self._indice.get(url) or {}
+            self._indice[url] = {"arquivo": arquivo, "etag": etag, "modificado": modificado,
+                                 "verificado": time.time(), "bytes": tamanho}
+            self._total_bytes += tamanho - anterior.get("bytes", 0)
+            self.estatisticas["baixadas"] += 1
+            if self._total_bytes > self.limite_bytes: self._despejar(protegido=url)
+        desempenho.contar("remotas_bytes", len(dados))
+        return "baixada"
+
+    def _contar(self, nome):
+        with self._lock: self.estatisticas[nome] += 1
+
+    def _despejar(self, protegido=None):
+        # Chamado com o lock: remove as cópias verificadas há mais tempo até ficar em 90% do limite
+        # (a folga evita ordenar o índice de novo a cada download)
+        agora = time.time()
+        candidatos = sorted((i.get("verificado", 0), u) for u, i in self._indice.items()
+                            if u != protegido and i.get("arquivo"))
+        for _, url in candidatos:
+            if self._total_bytes <= self.limite_bytes * 0.9: break
+            info = self._indice[url]
+            # Fica a marca (sem arquivo): a vitrine usa a URL original e o prefetch espera o TTL
+            self._indice[url] = {"verificado": agora, "despejada": True}
+            self._total_bytes -= info.get("bytes", 0)
+            try:
+                os.remove(os.path.join(self.pasta, info["arquivo"]))
+            except OSError:
+                pass
+            self.estatisticas["despejadas"] += 1
+
+    def fechar(self):
+        self._executor.shutdown(wait=True)
+        self.salvar_indice()
@@ -0,0 +1,249 @@
+"""Importação em massa de listas de preço de fornecedores (CSV ou XLSX).
+
+O arquivo é lido em blocos de tamanho fixo: cada bloco é mapeado para as colunas do
+sistema, validado e deduplicado com operações vetorizadas e guardado numa tabela temporária;
+só no fim tudo entra no catálogo, numa transação curta (as outras sessões não ficam esperando
+a leitura do arquivo). A memória fica limitada ao tamanho do bloco (mais os códigos já vistos).
+
+Uso:
+    python -m fantini.importacao lista.csv --fabricante "Vinagre Belmont" \\
+        [--mapa "COD. PRODUTO=codigo" --mapa "PRECO=VAREJO - 50 A 199"] [--bloco 5000] [--simular]
+"""
+import os
+import csv
+import io
+import argparse
+from contextlib import contextmanager
+from .armazenamento import Armazenamento, ARQUIVO_BANCO, COLUNAS_FIXAS
+from .busca import normalizar
+
+TAMANHO_BLOCO = 5000
+MAX_EXEMPLOS_REJEICAO = 50
+
+# Nomes usuais nas planilhas dos fornecedores (já normalizados) -> coluna do sistema
+SINONIMOS = {
+    "codigo": ["codigo", "cod", "cod produto", "cod. produto", "referencia", "ref", "sku", "item"],
+    "barras": ["barras", "ean", "ean13", "gtin", "cod barras", "codigo de barras", "cod. barras"],
+    "nome": ["nome", "descricao", "descricao do produto", "produto", "desc"],
+    "fabricante": ["fabricante", "marca", "fornecedor"],
+}
+
+
+class ErroSimulacao(Exception):
+    """Usada para descartar o que foi lido no modo --simular (nada entra no catálogo)."""
+
+
+def _rotulo(col):
+    return " ".join(normalizar(col).replace("_", " ").split())
+
+
+def mapear_colunas(colunas_arquivo, tabelas_preco, mapa=None):
+    """Sugere o mapeamento coluna do arquivo -> coluna do sistema; `mapa` (explícito) tem prioridade."""
+    mapa = dict(mapa or {})
+    usados = set(mapa.values())
+    alvos = {s: destino for destino, sins in SINONIMOS.items() for s in sins}
+    alvos.update({_rotulo(t): t for t in tabelas_preco})
+    for col in colunas_arquivo:
+        if col in mapa: continue
+        destino = alvos.get(_rotulo(col))
+        if destino and destino not in usados:
+            mapa[col] = destino
+            usados.add(destino)
+    return {c: d for c, d in mapa.items() if c in colunas_arquivo and d}
+
+
+def _delimitador(amostra):
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=";,\t|").delimiter
+    except csv.Error:
+        return ";" if amostra.count(";") > amostra.count(",") else ","
+
+
+@contextmanager
+def _abrir_texto(origem, encoding):
+    if isinstance(origem, (str, os.PathLike)):
+        with open(origem, encoding=encoding, errors="replace", newline="") as f: yield f
+        return
+    # Arquivo já aberto (upload do Streamlit): lê do início e devolve sem fechar
+    origem.seek(0)
+    f = io.TextIOWrapper(origem, encoding=encoding, errors="replace", newline="")
+    try:
+        yield f
+    finally:
+        f.detach()
+
+
+def ler_em_blocos(origem, nome=None, tamanho=TAMANHO_BLOCO, encoding="utf-8-sig"):
+    """Gera DataFrames (tudo como texto) de até `tamanho` linhas. `origem`: caminho ou arquivo binário."""
+    import pandas as pd
+    nome = nome or str(origem)
+    if nome.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RuntimeError("Para importar .xlsx instale o openpyxl (pip install openpyxl)")
+        wb = load_workbook(origem, read_only=True, data_only=True)  # read_only: lê linha a linha
+        try:
+            linhas = wb.worksheets[0].iter_rows(values_only=True)
+            cab = [str(c).strip() if c is not None else f"coluna_{i}" for i, c in enumerate(next(linhas, ()))]
+            bloco = []
+            for linha in linhas:
+                bloco.append(["" if v is None else str(v) for v in linha[:len(cab)]])
+                if len(bloco) >= tamanho:
+                    yield pd.DataFrame(bloco, columns=cab[:len(bloco[0])]); bloco = []
+            if bloco: yield pd.DataFrame(bloco, columns=cab[:len(bloco[0])])
+        finally:
+            wb.close()
+        return
+    with _abrir_texto(origem, encoding) as f:
+        sep = _delimitador(f.read(8192)); f.seek(0)
+        for bloco in pd.read_csv(f, sep=sep, dtype=str, keep_default_na=False, chunksize=tamanho,
+                                 skipinitialspace=True):
+            bloco.columns = [str(c).strip() for c in bloco.columns]
+            yield bloco
+
+
+def colunas_do_arquivo(origem, nome=None):
+    for bloco in ler_em_blocos(origem, nome, tamanho=1):
+        return list(bloco.columns)
+    return []
+
+
+def _numeros(serie):
+    # Aceita "1.234,56", "1234,56", "R$ 28,19" e "28.19"
+    import pandas as pd
+    s = serie.astype(str).str.replace(r"[R$\s]", "", regex=True)
+    br = s.str.contains(",", regex=False)
+    s = s.where(~br, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(s, errors="coerce")
+
+
+def preparar_bloco(bloco, mapa, tabelas, fabricante=None, por_barras=None, existentes=()):
+    """Mapeia e valida um bloco. Retorna (válidos, rejeitados[motivo]) como DataFrames.
+
+    Produtos já cadastrados (`existentes`) podem vir sem nome: só as colunas preenchidas são atualizadas.
+    O EAN identifica o produto como o código: linha cujo EAN já é de outro código é rejeitada.
+    """
+    import pandas as pd
+    df = bloco[list(mapa)].rename(columns=mapa)
+    for c in ("codigo", "barras", "nome"):
+        if c not in df.columns: df[c] = ""
+        df[c] = df[c].fillna("").astype(str).str.strip()
+    if fabricante: df["fabricante"] = fabricante
+    df["barras"] = df["barras"].str.replace(r"\D", "", regex=True)
+    # Sem código: reaproveita o produto com o mesmo EAN, senão cria um AUTO-<EAN>
+    sem_cod = (df["codigo"] == "") & (df["barras"] != "")
+    if sem_cod.any():
+        achados = df.loc[sem_cod, "barras"].map(por_barras or {})
+        df.loc[sem_cod, "codigo"] = achados.where(achados.notna(), "AUTO-" + df.loc[sem_cod, "barras"])
+
+    motivo = pd.Series("", index=df.index)
+    motivo = motivo.mask((df["nome"] == "") & ~df["codigo"].isin(existentes), "produto novo sem nome")
+    motivo = motivo.mask((motivo == "") & (df["codigo"] == ""), "sem código e sem EAN")
+    ean_ruim = (df["barras"] != "") & ~df["barras"].str.len().isin([8, 12, 13, 14])
+    motivo = motivo.mask((motivo == "") & ean_ruim, "EAN inválido")
+    # Código novo (ou outro código) com o EAN de um produto já cadastrado: seria um produto duplicado
+    dono = df["barras"].map(por_barras or {})
+    ean_de_outro = (df["barras"] != "") & dono.notna() & (dono != df["codigo"])
+    motivo = motivo.mask((motivo == "") & ean_de_outro, "EAN já cadastrado no produto " + dono.astype(str))
+    for t in [c for c in df.columns if c in tabelas]:
+        bruto = df[t].astype(str).str.strip()
+        valor = _numeros(bruto)
+        ruim = ((bruto != "") & valor.isna()) | (valor < 0)
+        motivo = motivo.mask((motivo == "") & ruim, f"preço inválido em {t}")
+        df[t] = valor.fillna(0.0)
+
+    rejeitados = df[motivo != ""].assign(motivo=motivo[motivo != ""])
+    return df[motivo == ""], rejeitados
+
+
+def deduplicar(validos):
+    """Mesmo código ou mesmo EAN repetido dentro do bloco: vale a última linha."""
+    validos = validos.drop_duplicates(subset="codigo", keep="last")
+    return validos[~((validos["barras"] != "") & validos["barras"].duplicated(keep="last"))]
+
+
+def importar(origem, banco, nome=None, mapa=None, fabricante=None, tamanho=TAMANHO_BLOCO,
+             simular=False, progresso=None):
+    """Importa o arquivo todo numa transação. Retorna o relatório com as contagens."""
+    regras = banco.regras()
+    manuais = [t for t in banco.tabelas() if t not in regras]
+    codigos_existentes, por_barras = banco.chaves()
+    rel = {"lidas": 0, "inseridos": 0, "atualizados": 0, "repetidos": 0, "rejeitados": 0,
+           "exemplos_rejeicao": [], "colunas": {}, "simulado": simular}
+    vistos = set()
+    try:
+        with banco.lote() as gravar:
+            for bloco in ler_em_blocos(origem, nome, tamanho):
+                if not rel["colunas"]:
+                    rel["colunas"] = mapear_colunas(list(bloco.columns), manuais, mapa)
+                    destinos = list(rel["colunas"].values())
+                    repetidos = sorted({d for d in destinos if destinos.count(d) > 1})
+                    if repetidos:
+                        raise ValueError("mais de uma coluna do arquivo mapeada para: " + ", ".join(repetidos))
+                    if not {"codigo", "barras"} & set(rel["colunas"].values()):
+                        raise ValueError("nenhuma coluna do arquivo foi mapeada para 'codigo' ou 'barras'")
+                rel["lidas"] += len(bloco)
+                validos, rejeitados = preparar_bloco(bloco, rel["colunas"], manuais, fabricante, por_barras,
+                                                     codigos_existentes)
+                antes = len(validos)
+                validos = deduplicar(validos)
+                rel["repetidos"] += antes - len(validos)
+                rel["rejeitados"] += len(rejeitados)
+                falta = MAX_EXEMPLOS_REJEICAO - len(rel["exemplos_rejeicao"])
+                if falta > 0:
+                    rel["exemplos_rejeicao"] += [
+                        f"{r.codigo or r.barras or '?'} ({r.nome or 'sem nome'}): {r.motivo}"
+                        for r in rejeitados.head(falta).itertuples()]
+                cods = validos["codigo"]
+                ja_visto = cods.isin(vistos)
+                rel["repetidos"] += int(ja_visto.sum())
+                novos = ~ja_visto & ~cods.isin(codigos_existentes)
+                rel["inseridos"] += int(novos.sum())
+                rel["atualizados"] += int((~ja_visto & ~novos).sum())
+                vistos.update(cods)
+                codigos_existentes.update(cods)
+                # EANs que este bloco cadastrou valem para os próximos blocos
+                for ean, cod in zip(validos["barras"], cods):
+                    if ean: por_barras.setdefault(ean, cod)
+                colunas = ["codigo"] + [c for c in validos.columns if c in COLUNAS_FIXAS[1:] or c in manuais]
+                gravar(validos[colunas].to_dict("records"), colunas)
+                if progresso: progresso(rel["lidas"])
+            if simular: raise ErroSimulacao()
+    except ErroSimulacao:
+        pass
+    rel["versao"] = None if simular else banco.versao()
+    return rel
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Importa lista de preços (CSV/XLSX) para o catálogo")
+    ap.add_argument("arquivo")
+    ap.add_argument("--fabricante", help="preenche o fabricante de todas as linhas")
+    ap.add_argument("--mapa", action="append", default=[], metavar="COLUNA=DESTINO",
+                    help="coluna do arquivo -> codigo/barras/nome/fabricante ou nome da tabela de preço")
+    ap.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="linhas por bloco")
+    ap.add_argument("--encoding", default="utf-8-sig")
+    ap.add_argument("--simular", action="store_true", help="valida e conta, mas não grava nada")
+    ap.add_argument("--banco", default=ARQUIVO_BANCO)
+    a = ap.parse_args(argv)
+
+    mapa = dict(m.split("=", 1) for m in a.mapa)
+    banco = Armazenamento(a.banco)
+    origem = a.arquivo if a.arquivo.lower().endswith((".xlsx", ".xlsm")) else open(a.arquivo, "rb")
+    try:
+        rel = importar(origem, banco, nome=a.arquivo, mapa=mapa, fabricante=a.fabricante, tamanho=a.bloco,
+                       simular=a.simular, progresso=lambda n: print(f"\r{n} linhas lidas", end="", flush=True))
+    finally:
+        if not isinstance(origem, str): origem.close()
+    print()
+    print("Colunas: " + ", ".join(f"{k} → {v}" for k, v in rel["colunas"].items()))
+    print(f"Inseridos: {rel['inseridos']}  Atualizados: {rel['atualizados']}  "
+          f"Repetidos no arquivo: {rel['repetidos']}  Rejeitados: {rel['rejeitados']}"
+          + ("  (simulação: nada gravado)" if a.simular else ""))
+    for ex in rel["exemplos_rejeicao"]: print(f"  - {ex}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,201 @@
+"""Livro de preços do catálogo inteiro: um ZIP com os PDFs por fabricante, em volumes.
+
+O fpdf guarda o documento inteiro na memória até o output(), então um PDF único com todos
+os produtos (e todas as fotos) cresce junto com o catálogo. Aqui cada fabricante vira um ou
+mais volumes de até ITENS_POR_VOLUME produtos, montados página a página; cada volume é
+gravado no ZIP e descartado antes do próximo, e o pico de memória fica no tamanho de um
+volume, seja qual for o tamanho do catálogo.
+
+Uso:
+    python -m fantini.livro TABELA [--saida livro.zip] [--fabricante NOME] [--itens-por-volume 500]
+"""
+import os
+import re
+import sys
+import zipfile
+import tempfile
+import argparse
+from datetime import datetime
+from . import EMPRESAS, desempenho
+from .armazenamento import Armazenamento, ARQUIVO_BANCO, COLUNAS_FIXAS
+from .catalogo import IndiceCatalogo
+from .memoria import compactar, densa
+
+ITENS_POR_VOLUME = 500
+LARGURAS = (15, 25, 110, 40)  # foto, código, descrição, preço (mm)
+ALTURA_LINHA = 15  # mm por linha de texto na tabela
+COLUNAS = ("codigo", "barras", "nome")
+
+
+def secoes(df, tabela, fabricante="Todos", itens_por_volume=ITENS_POR_VOLUME, sem_preco=False):
+    """(fabricante, volume, total de volumes, posições no df) de cada volume do livro.
+
+    Fabricantes na ordem de EMPRESAS (os outros depois, por nome). Produtos com preço 0,0
+    na tabela (sem preço) ficam de fora, a não ser com `sem_preco=True`.
+    """
+    import numpy as np
+    fabs = df["fabricante"].astype(str).to_numpy()
+    manter = np.ones(len(df), dtype=bool) if sem_preco else \
+        df[tabela].to_numpy(dtype="float64", na_value=0.0) != 0.0
+    presentes = set(fabs)
+    nomes = [fabricante] if fabricante != "Todos" else \
+        [f for f in EMPRESAS if f in presentes] + sorted(presentes - set(EMPRESAS))
+    for fab in nomes:
+        pos = np.flatnonzero((fabs == fab) & manter)
+        total = -(-len(pos) // itens_por_volume)
+        for n in range(total):
+            yield fab, n + 1, total, pos[n * itens_por_volume:(n + 1) * itens_por_volume]
+
+
+def _limpo(texto):
+    return re.sub(r"[^A-Za-z0-9]+", "-", texto).strip("-")
+
+
+def _nome_volume(fabricante, volume, total):
+    nome = _limpo(fabricante) or "Sem-fabricante"
+    return f"{nome}.pdf" if total == 1 else f"{nome}_vol{volume:02d}.pdf"
+
+
+def nome_livro(tabela, fabricante="Todos"):
+    return f"Livro_{_limpo(tabela)}" + ("" if fabricante == "Todos" else f"_{_limpo(fabricante)}") + ".zip"
+
+
+def _linha(pdf, indice, codigo, barras, nome, preco):
+    """Células de uma linha da tabela e a altura (mm) que ela vai ocupar.
+
+    Mede como o fpdf vai quebrar o código e a descrição (nomes longos ocupam 3+ linhas) e a
+    altura da foto na largura da coluna. Chamada com a fonte da tabela já ativa.
+    """
+    from PIL import Image
+    from .pdf import imagem_pdf
+    caminho_img, _ = indice.caminho_imagem(codigo)
+    img = imagem_pdf(caminho_img) if caminho_img else None
+    cod = str(codigo).replace("AUTO-", "")
+    texto = f"{nome}\nEAN: {barras if str(barras) != 'nan' else ''}"
+    n = max(len(pdf.multi_cell(LARGURAS[1], ALTURA_LINHA, cod, dry_run=True, output="LINES")),
+            len(pdf.multi_cell(LARGURAS[2], ALTURA_LINHA, texto, dry_run=True, output="LINES")))
+    altura = n * ALTURA_LINHA
+    if img is not None:
+        with Image.open(img) as im: largura_px, altura_px = im.size  # só lê o cabeçalho
+        if hasattr(img, "seek"): img.seek(0)
+        altura = max(altura, LARGURAS[0] * altura_px / max(largura_px, 1))
+    return (img, cod, texto, preco), altura
+
+
+def gerar_volume(itens, fabricante, volume, total, tabela, indice, obs="", avancar=None):
+    """PDF de um volume (`itens`: fatia do catálogo já só com este fabricante)."""
+    from fpdf.fonts import FontFace
+    from .pdf import PDF
+    pdf = PDF(orientation='P', unit='mm', format='A4')
+    pdf.alias_nb_pages()
+    titulo = fabricante.upper() + (f" - VOLUME {volume}/{total}" if total > 1 else "")
+    cabecalho = FontFace(emphasis="BOLD", color=255, fill_color=(44, 62, 80))
+    linhas = densa(itens, [*COLUNAS, tabela]).itertuples(index=False, name=None)
+    feitos, proxima = 0, None
+    while feitos < len(itens):
+        # Uma página por vez: a tabela de cada página leva as linhas que cabem nela, pela altura medida
+        pdf.add_page()
+        pdf.set_fill_color(240, 240, 240)
+        pdf.set_font("helvetica", 'B', 11)
+        pdf.cell(0, 8, f" {titulo}" + (" (cont.)" if feitos else ""), fill=True, ln=True)
+        if not feitos:
+            pdf.set_font("helvetica", '', 9)
+            pdf.cell(0, 5, f" TABELA: {tabela.upper()}   DATA: {datetime.now().strftime('%d/%m/%Y')}", ln=True)
+        pdf.ln(2)
+        pdf.set_font("helvetica", size=9)
+        livre = pdf.page_break_trigger - pdf.get_y() - ALTURA_LINHA  # menos a linha de títulos
+        pagina = []
+        while feitos + len(pagina) < len(itens):
+            if proxima is None: proxima = _linha(pdf, indice, *next(linhas))
+            # A linha que não cabe abre a próxima página (uma linha maior que a página vai sozinha)
+            if pagina and proxima[1] > livre: break
+            pagina.append(proxima[0])
+            livre -= proxima[1]
+            proxima = None
+        with pdf.table(col_widths=LARGURAS, text_align=("C", "L", "L", "R"), line_height=ALTURA_LINHA) as table:
+            row = table.row()
+            for titulo_col in ("FOTO", "CÓDIGO", "DESCRIÇÃO", "PREÇO"): row.cell(titulo_col, style=cabecalho)
+            for img, cod, texto, preco in pagina:
+                row = table.row()
+                if img is not None: row.cell(img=img, img_fill_width=True)
+                else: row.cell("-")
+                row.cell(cod, align="C")
+                row.cell(texto)
+                row.cell(f"R$ {preco:,.2f}", style=FontFace(emphasis="BOLD"))
+        feitos += len(pagina)
+        if avancar: avancar(len(pagina))
+    pdf.ln(5)
+    pdf.set_font("helvetica", 'I', 8)
+    pdf.multi_cell(0, 5, f"Obs: {obs if obs else 'Sujeito a alteração sem aviso prévio.'}")
+    return pdf.output(dest='S')
+
+
+@desempenho.cronometrar("gerar_livro")
+def gerar_livro(df, tabela, destino, indice=None, fabricante="Todos", obs="",
+                itens_por_volume=ITENS_POR_VOLUME, sem_preco=False, progresso=None):
+    """Grava o livro de preços em `destino` (ZIP) e retorna o resumo dos volumes.
+
+    `progresso(feitos, total, fabricante)` é chamado a cada página montada. O ZIP é escrito
+    num arquivo temporário ao lado e só troca de nome no fim (quem baixa nunca vê pela metade).
+    """
+    if tabela not in df.columns or tabela in COLUNAS_FIXAS:
+        raise ValueError(f"tabela de preço inexistente: {tabela!r}")
+    indice = indice if indice is not None else IndiceCatalogo(df)
+    volumes = list(secoes(df, tabela, fabricante, itens_por_volume, sem_preco))
+    total = sum(len(pos) for *_, pos in volumes)
+    if not total: raise ValueError("nenhum produto com preço nesta tabela")
+    feitos = 0
+    resumo = []
+    # Nome único: duas sessões (mesmo processo) gerando o mesmo livro não dividem o temporário
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(destino) + ".", suffix=".tmp",
+                               dir=os.path.dirname(destino) or ".")
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as zf:  # PDF e JPEG já vêm comprimidos
+            for fab, vol, n_vol, pos in volumes:
+                def avancar(n, fab=fab):
+                    nonlocal feitos
+                    feitos += n
+                    if progresso: progresso(feitos, total, fab)
+                dados = gerar_volume(df.iloc[pos], fab, vol, n_vol, tabela, indice, obs, avancar)
+                nome = _nome_volume(fab, vol, n_vol)
+                zf.writestr(nome, bytes(dados))
+                resumo.append({"arquivo": nome, "fabricante": fab, "itens": len(pos), "bytes": len(dados)})
+                desempenho.contar("livro_volumes")
+                del dados
+        os.replace(tmp, destino)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+    return resumo
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gera o livro de preços (ZIP com um PDF por fabricante/volume)")
+    ap.add_argument("tabela", help="tabela de preço")
+    ap.add_argument("--saida", help="arquivo ZIP (padrão: pdfs/Livro_<TABELA>[_<FABRICANTE>].zip)")
+    ap.add_argument("--fabricante", default="Todos")
+    ap.add_argument("--itens-por-volume", type=int, default=ITENS_POR_VOLUME)
+    ap.add_argument("--sem-preco", action="store_true", help="inclui produtos com preço 0,0 na tabela")
+    ap.add_argument("--obs", default="")
+    ap.add_argument("--banco", default=ARQUIVO_BANCO)
+    a = ap.parse_args(argv)
+
+    saida = a.saida or os.path.join("pdfs", nome_livro(a.tabela, a.fabricante))
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    df = compactar(Armazenamento(a.banco).carregar())
+
+    def progresso(feitos, total, fab):
+        print(f"\r{feitos}/{total} produtos ({fab})", end="", file=sys.stderr, flush=True)
+    try:
+        resumo = gerar_livro(df, a.tabela, saida, fabricante=a.fabricante, obs=a.obs,
+                             itens_por_volume=a.itens_por_volume, sem_preco=a.sem_preco, progresso=progresso)
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr); return 1
+    print(file=sys.stderr)
+    for r in resumo: print(f"  {r['arquivo']}: {r['itens']} itens, {r['bytes'] / 1024:.0f} KB")
+    print(f"Livro: {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
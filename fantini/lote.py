@@ -0,0 +1,146 @@
+"""Geração em lote de tabelas em PDF, sem Streamlit.
+
+Uso:
+    python -m fantini.lote trabalhos.json --saida pdfs/ [--workers 4]
+
+O arquivo de trabalhos pode ser .json (lista), .jsonl (um por linha) ou .csv, com os campos:
+    cliente, tabela, fabricante ("Todos" se vazio), codigos ("all"/"todos" ou lista; no CSV
+    separados por ";"), obs e, opcionalmente, arquivo (nome do PDF de saída).
+"""
+import os
+import re
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from . import pdf as gerador_pdf
+from .armazenamento import Armazenamento, ARQUIVO_BANCO, COLUNAS_FIXAS
+from .catalogo import IndiceCatalogo
+from .memoria import compactar
+from .miniaturas import miniatura
+
+TODOS = ("all", "todos", "*", "")
+
+# Estado de cada processo filho (preenchido uma vez em _iniciar_worker)
+_df = None
+_indice = None
+
+
+def ler_trabalhos(caminho):
+    ext = os.path.splitext(caminho)[1].lower()
+    with open(caminho, encoding="utf-8") as f:
+        if ext == ".json": return json.load(f)
+        if ext == ".jsonl": return [json.loads(l) for l in f if l.strip()]
+        trabalhos = list(csv.DictReader(f))
+    for t in trabalhos:
+        cods = (t.get("codigos") or "").strip()
+        t["codigos"] = cods if cods.lower() in TODOS else [c.strip() for c in cods.split(";") if c.strip()]
+    return trabalhos
+
+
+def _nome_arquivo(n, job):
+    if job.get("arquivo"): return job["arquivo"]
+    partes = [job.get("cliente") or "Geral", job.get("fabricante") or "Todos", job["tabela"]]
+    return f"{n:04d}_" + re.sub(r"[^A-Za-z0-9]+", "-", "_".join(partes)).strip("-") + ".pdf"
+
+
+def _iniciar_worker(df, imagens):
+    # Catálogo e miniaturas chegam prontos do processo pai: nada é relido por PDF
+    global _df, _indice
+    _df = df
+    _indice = IndiceCatalogo(df)
+    gerador_pdf.IMAGENS_CARREGADAS.update(imagens)
+
+
+def selecionar_itens(df, indice, job):
+    fab = job.get("fabricante") or "Todos"
+    cods = job.get("codigos", "all")
+    if isinstance(cods, str) and cods.strip().lower() in TODOS:
+        itens = df
+        faltas = []
+    else:
+        pos = [indice.posicao(c) for c in cods]
+        faltas = [f"{c}: código não encontrado no catálogo" for c, p in zip(cods, pos) if p is None]
+        itens = df.iloc[[p for p in pos if p is not None]]
+    if fab != "Todos": itens = itens[itens["fabricante"] == fab]
+    return itens, faltas
+
+
+def _gerar_trabalho(n, job, pasta_saida):
+    t0 = time.perf_counter()
+    resumo = {"n": n, "cliente": job.get("cliente", ""), "tabela": job.get("tabela", ""),
+              "fabricante": job.get("fabricante") or "Todos", "arquivo": "", "itens": 0, "bytes": 0,
+              "segundos": 0.0, "status": "ok", "avisos": ""}
+    try:
+        if job.get("tabela") not in _df.columns or job["tabela"] in COLUNAS_FIXAS:
+            raise ValueError(f"tabela de preço inexistente: {job.get('tabela')!r}")
+        itens, faltas = selecionar_itens(_df, _indice, job)
+        if itens.empty: raise ValueError("nenhum produto selecionado")
+        pdf = gerador_pdf.gerar_pdf_final(itens, job.get("cliente", ""), job.get("obs", ""), job["tabela"],
+                                          _indice, faltas=faltas)
+        arquivo = _nome_arquivo(n, job)
+        with open(os.path.join(pasta_saida, arquivo), "wb") as f: f.write(bytes(pdf))
+        resumo.update(arquivo=arquivo, itens=len(itens), bytes=len(pdf), avisos=" | ".join(faltas))
+    except Exception as e:
+        resumo.update(status="erro", avisos=str(e))
+    resumo["segundos"] = round(time.perf_counter() - t0, 4)
+    return resumo
+
+
+def carregar_imagens(df, indice):
+    # Gera (se preciso) e lê as miniaturas do PDF uma vez só, para todos os processos
+    imagens = {}
+    for cod in df["codigo"]:
+        caminho, _ = indice.caminho_imagem(cod)
+        if caminho and caminho not in imagens:
+            with open(miniatura(caminho, "pdf"), "rb") as f: imagens[caminho] = f.read()
+    return imagens
+
+
+def gerar_lote(trabalhos, pasta_saida, df, workers=None):
+    os.makedirs(pasta_saida, exist_ok=True)
+    indice = IndiceCatalogo(df)
+    imagens = carregar_imagens(df, indice)
+    t0 = time.perf_counter()
+    resumos = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker, initargs=(df, imagens)) as ex:
+        futuros = [ex.submit(_gerar_trabalho, n, job, pasta_saida) for n, job in enumerate(trabalhos, 1)]
+        for fut in as_completed(futuros): resumos.append(fut.result())
+    total = time.perf_counter() - t0
+    resumos.sort(key=lambda r: r["n"])
+    return resumos, total
+
+
+def gravar_resumo(resumos, pasta_saida):
+    caminho = os.path.join(pasta_saida, "resumo.csv")
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(resumos[0].keys()))
+        w.writeheader(); w.writerows(resumos)
+    return caminho
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gera tabelas em PDF em lote")
+    ap.add_argument("trabalhos", help="arquivo .json/.jsonl/.csv com os trabalhos")
+    ap.add_argument("--saida", default="pdfs", help="pasta de saída (padrão: pdfs)")
+    ap.add_argument("--workers", type=int, default=None, help="processos em paralelo (padrão: nº de CPUs)")
+    ap.add_argument("--banco", default=ARQUIVO_BANCO)
+    a = ap.parse_args(argv)
+
+    trabalhos = ler_trabalhos(a.trabalhos)
+    if not trabalhos: ap.error("nenhum trabalho no arquivo")
+    df = compactar(Armazenamento(a.banco).carregar())  # cada processo filho recebe uma cópia: quanto menor, melhor
+    resumos, total = gerar_lote(trabalhos, a.saida, df, a.workers)
+    caminho = gravar_resumo(resumos, a.saida)
+
+    ok = sum(r["status"] == "ok" for r in resumos)
+    print(f"{ok}/{len(resumos)} PDFs gerados em {total:.2f}s ({ok / total if total else 0:.1f} PDFs/s)")
+    for r in resumos:
+        if r["status"] != "ok": print(f"  #{r['n']} {r['cliente']}: {r['avisos']}")
+    print(f"Resumo: {caminho}")
+    return 0 if ok == len(resumos) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
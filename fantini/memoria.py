@@ -0,0 +1,85 @@
+"""Catálogo compacto em memória e relatório do quanto cada parte ocupa.
+
+- fabricante: categoria (poucos valores repetidos em milhares de linhas);
+- textos: strings em Arrow quando o pyarrow está instalado (sem um objeto Python por célula);
+- tabelas de preço quase todas zeradas: colunas esparsas (só os valores diferentes de 0,0).
+"""
+import sys
+
+COLUNAS_CATEGORIA = ("fabricante",)
+COLUNAS_TEXTO = ("codigo", "barras", "nome", "imagem")
+# Coluna de preço vira esparsa quando ao menos esta fração das linhas é 0,0
+FRACAO_ZEROS_ESPARSA = 0.5
+
+
+def _tipo_texto(pd):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    # No pandas 3 o "str" padrão já é Arrow quando o pyarrow está instalado
+    return "str" if int(pd.__version__.split(".")[0]) >= 3 else "string[pyarrow]"
+
+
+def compactar(df, precos=None):
+    """Catálogo com os tipos compactos. `precos`: colunas de preço (padrão: as não fixas numéricas).
+
+    Colunas já compactas não são tocadas, então dá para chamar de novo após cada alteração.
+    """
+    import pandas as pd
+    texto = _tipo_texto(pd)
+    if precos is None:
+        precos = [c for c in df.columns if c not in COLUNAS_CATEGORIA + COLUNAS_TEXTO]
+    tipos = {}
+    for c in df.columns:
+        atual = df[c].dtype
+        if c in COLUNAS_CATEGORIA:
+            if not isinstance(atual, pd.CategoricalDtype): tipos[c] = "category"
+        elif c in COLUNAS_TEXTO:
+            if texto and atual != texto: tipos[c] = texto
+        elif c in precos:
+            valores = df[c].to_numpy(dtype="float64", na_value=0.0)
+            esparsa = len(valores) and (valores == 0.0).mean() >= FRACAO_ZEROS_ESPARSA
+            novo = pd.SparseDtype("float64", 0.0) if esparsa else "float64"
+            if atual != novo: tipos[c] = novo
+    return df.astype(tipos) if tipos else df
+
+
+def densa(df, colunas):
+    """Cópia só das `colunas` com preços densos e textos comuns (para tabelas editáveis da tela)."""
+    import pandas as pd
+    tipos = {}
+    for c in colunas:
+        t = df[c].dtype
+        if isinstance(t, pd.SparseDtype): tipos[c] = "float64"
+        elif isinstance(t, pd.CategoricalDtype): tipos[c] = t.categories.dtype
+    df = df[colunas].astype(tipos) if tipos else df[colunas]
+    df.attrs = {}  # versão/regras do catálogo não vão para o navegador
+    return df
+
+
+def bytes_de(obj):
+    """Memória aproximada de um objeto (DataFrame, array, bytes ou coleções deles)."""
+    import pandas as pd
+    if isinstance(obj, pd.DataFrame): return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series): return int(obj.memory_usage(deep=True))
+    if hasattr(obj, "nbytes"): return int(obj.nbytes)
+    if isinstance(obj, (bytes, bytearray, memoryview)): return len(obj)
+    if isinstance(obj, dict): return sys.getsizeof(obj) + sum(bytes_de(v) for v in obj.values())
+    if isinstance(obj, (list, tuple, set)): return sys.getsizeof(obj) + sum(bytes_de(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def relatorio(df):
+    """Por coluna: tipo, bytes no formato compacto e no formato largo antigo (float64/objeto)."""
+    import pandas as pd
+    linhas = []
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.SparseDtype) or pd.api.types.is_float_dtype(s.dtype):
+            largo = len(s) * 8
+        else:
+            largo = int(s.astype(object).memory_usage(deep=True, index=False))
+        linhas.append({"coluna": c, "tipo": str(s.dtype),
+                       "bytes": int(s.memory_usage(deep=True, index=False)), "bytes_largo": largo})
+    return pd.DataFrame(linhas)
@@ -0,0 +1,96 @@
+import os
+import hashlib
+import threading
+from .imagens import hash_do_nome
+from . import desempenho
+
+# Cache em disco das imagens derivadas (PDF e preview), gerado sob demanda
+PASTA_CACHE = os.path.join("static", "_miniaturas")
+LIMITE_CACHE_BYTES = int(os.environ.get("FANTINI_CACHE_MINIATURAS_MB", "64")) * 1024 * 1024
+
+# variante -> lado máximo em px. PDF: célula de 15mm (~180px a 300dpi). Preview: card de 50px (2x)
+VARIANTES = {"pdf": 200, "preview": 100}
+
+_lock = threading.Lock()
+_hashes = {}        # (caminho, mtime_ns, tamanho) -> hash do conteúdo
+_total_bytes = None  # tamanho atual do cache (lido do disco na primeira gravação)
+
+
+def _hash_conteudo(caminho, st_):
+    h = hash_do_nome(caminho)  # fotos do acervo já têm o sha1 no nome
+    if h: return h
+    # O mtime + tamanho evitam reler o arquivo inteiro a cada chamada
+    chave = (os.path.abspath(caminho), st_.st_mtime_ns, st_.st_size)
+    h = _hashes.get(chave)
+    if h is None:
+        dig = hashlib.sha1()
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                dig.update(bloco)
+        h = dig.hexdigest()
+        _hashes[chave] = h
+    return h
+
+
+def _gerar(origem, destino, lado):
+    from PIL import Image
+    with Image.open(origem) as img:
+        img.thumbnail((lado, lado), Image.LANCZOS)
+        # PDF e cards têm fundo branco: achata a transparência e grava em JPEG
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            img = img.convert("RGBA")
+            fundo = Image.new("RGB", img.size, (255, 255, 255))
+            fundo.paste(img, mask=img.getchannel("A"))
+            img = fundo
+        else:
+            img = img.convert("RGB")
+        tmp = f"{destino}.{threading.get_ident()}.tmp"
+        img.save(tmp, "JPEG", quality=85, optimize=True)
+    os.replace(tmp, destino)
+
+
+def _tamanho_pasta():
+    total = 0
+    for e in os.scandir(PASTA_CACHE):
+        if e.is_file(): total += e.stat().st_size
+    return total
+
+
+def _despejar(protegido):
+    # Remove as entradas usadas há mais tempo até voltar ao limite
+    global _total_bytes
+    entradas = sorted(
+        (e.stat().st_mtime, e.stat().st_size, e.path)
+        for e in os.scandir(PASTA_CACHE) if e.is_file() and e.path != protegido
+    )
+    for _, tam, caminho in entradas:
+        if _total_bytes <= LIMITE_CACHE_BYTES: break
+        try:
+            os.remove(caminho); _total_bytes -= tam
+        except OSError:
+            pass
+
+
+def miniatura(caminho, variante="pdf"):
+    """Caminho da versão reduzida de `caminho`. Se não der para gerar, devolve o original."""
+    global _total_bytes
+    from PIL import Image
+    lado = VARIANTES[variante]
+    try:
+        st_ = os.stat(caminho)
+        destino = os.path.join(PASTA_CACHE, f"{_hash_conteudo(caminho, st_)}_{variante}.jpg")
+        if os.path.exists(destino):
+            os.utime(destino)  # marca como usado recentemente (LRU pelo mtime)
+            desempenho.contar("miniatura_acerto")
+            return destino
+        with _lock:
+            if not os.path.exists(destino):
+                os.makedirs(PASTA_CACHE, exist_ok=True)
+                if _total_bytes is None: _total_bytes = _tamanho_pasta()
+                _gerar(caminho, destino, lado)
+                desempenho.contar("miniatura_gerada")
+                _total_bytes += os.path.getsize(destino)
+                if _total_bytes > LIMITE_CACHE_BYTES: _despejar(destino)
+        return destino
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return caminho
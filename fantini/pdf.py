@@ -0,0 +1,132 @@
+import io
+import os
+from datetime import datetime
+from fpdf import FPDF
+from fpdf.fonts import FontFace
+from .catalogo import IndiceCatalogo
+from .miniaturas import miniatura
+from . import desempenho
+
+# Miniaturas já lidas para a memória, por caminho da imagem original.
+# O gerador em lote preenche antes de abrir os processos, que então não tocam o disco.
+IMAGENS_CARREGADAS = {}
+
+def imagem_pdf(caminho):
+    dados = IMAGENS_CARREGADAS.get(caminho)
+    return io.BytesIO(dados) if dados is not None else miniatura(caminho, "pdf")
+
+# --- CLASSE PDF (LAYOUT AJUSTADO) ---
+class PDF(FPDF):
+    def header(self):
+        # Logo
+        logo_path = None
+        for ext in ["png", "jpg"]:
+            if os.path.exists(f"static/logo.{ext}"): logo_path = f"static/logo.{ext}"
+        
+        if logo_path:
+            # x=10, y=10, w=30 (Aumentei um pouco o Y para descer a logo)
+            self.image(logo_path, 10, 10, 30) 
+        
+        # Título
+        self.set_y(18) # Desci o título para alinhar com a logo
+        self.set_font('helvetica', 'B', 15)
+        self.cell(45) # Pula a largura da logo
+        self.cell(0, 10, 'FANTINI REPRESENTAÇÕES', ln=False)
+        self.ln(25) # Quebra de linha maior para afastar do conteúdo
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('helvetica', 'I', 8)
+        self.cell(0, 10, f'Pag. {self.page_no()}/{{nb}}', align='C')
+
+@desempenho.cronometrar("gerar_pdf")
+def gerar_pdf_final(df_itens, cliente, obs, tabela_col, df_completo, faltas=None):
+    # df_completo pode ser o DataFrame do catálogo ou um IndiceCatalogo já montado
+    indice = df_completo if isinstance(df_completo, IndiceCatalogo) else IndiceCatalogo(df_completo)
+
+    # PDF SETUP
+    pdf = PDF(orientation='P', unit='mm', format='A4')
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    
+    # --- CABEÇALHO CINZA (POSICIONAMENTO NOVO) ---
+    # Antes estava em Y=30. Mudei para Y=45 para não cobrir a logo.
+    y_inicio_box = 45 
+    
+    pdf.set_fill_color(240, 240, 240)
+    # x=10, y=45, w=190, h=25
+    pdf.rect(10, y_inicio_box, 190, 25, 'F')
+    
+    # Textos dentro da caixa cinza
+    pdf.set_y(y_inicio_box + 2) 
+    pdf.set_x(15)
+    pdf.set_font("helvetica", 'B', 10)
+    pdf.cell(0, 5, f"TABELA: {tabela_col.upper()}", ln=True)
+    
+    pdf.set_x(15)
+    pdf.set_font("helvetica", '', 10)
+    pdf.cell(0, 5, f"CLIENTE: {cliente}", ln=True)
+    
+    pdf.set_x(15)
+    pdf.cell(0, 5, f"DATA: {datetime.now().strftime('%d/%m/%Y')}", ln=True)
+    
+    # Espaço para começar a tabela (pula a caixa cinza)
+    pdf.set_y(y_inicio_box + 30) 
+    
+    # --- TABELA DE PRODUTOS ---
+    w_foto = 15
+    w_cod = 25
+    w_desc = 110
+    w_preco = 40
+    col_widths = (w_foto, w_cod, w_desc, w_preco)
+    
+    # line_height=15 garante espaço vertical para a foto
+    with pdf.table(col_widths=col_widths, text_align=("C", "L", "L", "R"), line_height=15) as table:
+        
+        # Cabeçalho da Tabela
+        row = table.row()
+        header_style = FontFace(emphasis="BOLD", color=255, fill_color=(44, 62, 80))
+        row.cell("FOTO", style=header_style)
+        row.cell("CÓDIGO", style=header_style)
+        row.cell("DESCRIÇÃO", style=header_style)
+        row.cell("PREÇO", style=header_style)
+        
+        # Dados
+        pdf.set_font("helvetica", size=9)
+        
+        for idx, item in df_itens.iterrows():
+            row = table.row()
+            
+            # 1. FOTO
+            caminho_img, falta = indice.caminho_imagem(item["codigo"])
+            if caminho_img:
+                # img_fill_width=True força largura 15mm (usa a versão reduzida do cache)
+                row.cell(img=imagem_pdf(caminho_img), img_fill_width=True)
+            else:
+                row.cell("-")
+                if falta and faltas is not None: faltas.append(falta)
+
+            # 2. CÓDIGO
+            cod_limpo = str(item['codigo']).replace("AUTO-", "")
+            row.cell(cod_limpo, align="C")
+            
+            # 3. DESCRIÇÃO
+            ean = item['barras'] if str(item['barras']) != "nan" else ""
+            txt_desc = f"{item['nome']}\nEAN: {ean}"
+            row.cell(txt_desc)
+            
+            # 4. PREÇO
+            txt_preco = f"R$ {item[tabela_col]:,.2f}"
+            row.cell(txt_preco, style=FontFace(emphasis="BOLD"))
+
+    # --- RODAPÉ OBS ---
+    pdf.ln(5)
+    pdf.set_font("helvetica", 'I', 8)
+    pdf.multi_cell(0, 5, f"Obs: {obs if obs else 'Sujeito a alteração sem aviso prévio.'}")
+    
+    if desempenho.atual() is not None:
+        # Imagens realmente embutidas (o fpdf grava uma vez cada imagem repetida)
+        embutidas = pdf.image_cache.images.values()
+        desempenho.contar("pdf_imagens", len(embutidas))
+        desempenho.contar("pdf_bytes_imagens", sum(len(i["data"]) + len(i.get("smask") or b"") for i in embutidas))
+    return pdf.output(dest='S')
@@ -0,0 +1,73 @@
+import numpy as np
+
+DESCONTO_PIX = 0.05
+
+
+def arrays_custo(df):
+    """Custo base e máscara das linhas em dólar, como arrays NumPy (uma vez por catálogo)."""
+    custo = np.asarray(df["custo_base"], dtype=np.float64)
+    usd = np.asarray(df["moeda_base"].astype(str).str.upper() == "USD", dtype=bool)
+    return custo, usd
+
+
+def precos(custo, usd, dolar, imposto, margem, desconto=False):
+    # Converte para R$ só onde a moeda é USD (multiplicação mascarada) e aplica imposto, margem e Pix
+    fator = (1 + imposto/100) * (1 + margem/100) * ((1 - DESCONTO_PIX) if desconto else 1.0)
+    return np.where(usd, custo * dolar, custo) * fator
+
+
+def cubo_cenarios(custo, usd, dolares, margens, imposto, descontos=(False, True)):
+    """Avalia todos os cenários numa passada só.
+
+    Retorna um array (dólar, margem, desconto, produto) com o preço final de cada combinação.
+    """
+    d = np.asarray(dolares, dtype=np.float64)[:, None, None, None]
+    m = 1 + np.asarray(margens, dtype=np.float64)[None, :, None, None] / 100
+    p = np.where(np.asarray(descontos, dtype=bool), 1 - DESCONTO_PIX, 1.0)[None, None, :, None]
+    custo_reais = np.where(usd, custo * d, custo)  # (dólar, 1, 1, produto)
+    return custo_reais * (1 + imposto/100) * m * p
+
+
+class CuboPrecos:
+    """Cubo de preços com os eixos que o geraram; troca de cenário dentro da grade é só um fatiamento."""
+
+    def __init__(self, custo, usd, dolares, margens, imposto, descontos=(False, True), versao=None):
+        self.versao = versao  # versão do catálogo de onde vieram os custos
+        self.dolares = [round(float(x), 4) for x in dolares]
+        self.margens = [round(float(x), 4) for x in margens]
+        self.descontos = [bool(x) for x in descontos]
+        self.imposto = imposto
+        self.cubo = cubo_cenarios(custo, usd, self.dolares, self.margens, imposto, self.descontos)
+
+    def em(self, dolar, margem, desconto):
+        """Preços do cenário, ou None se ele estiver fora da grade."""
+        try:
+            i = self.dolares.index(round(float(dolar), 4))
+            j = self.margens.index(round(float(margem), 4))
+            k = self.descontos.index(bool(desconto))
+        except ValueError:
+            return None
+        return self.cubo[i, j, k]
+
+    def sensibilidade(self, desconto=False, agregado=np.mean):
+        """Tabela dólar × margem com o agregado (padrão: preço médio) de cada cenário."""
+        import pandas as pd
+        k = self.descontos.index(bool(desconto))
+        valores = agregado(self.cubo[:, :, k, :], axis=-1) if self.cubo.shape[-1] else \
+            np.zeros((len(self.dolares), len(self.margens)))
+        return pd.DataFrame(valores, index=pd.Index(self.dolares, name="Dólar"),
+                            columns=pd.Index(self.margens, name="Margem (%)"))
+
+
+def calcular_precos(df, dolar, imposto, margem, desconto, preco_final=None, custos=None):
+    """Formação de preço do simulador: custo em R$ + impostos + margem (- desconto Pix).
+
+    `preco_final` permite reaproveitar um vetor já calculado (ex.: fatia de um CuboPrecos);
+    `custos`, o (custo, usd) de `arrays_custo(df)` já guardado para este catálogo.
+    """
+    custo, usd = custos if custos is not None else arrays_custo(df)
+    custo_reais = np.where(usd, custo * dolar, custo)
+    preco_venda = custo_reais * (1 + imposto/100) * (1 + margem/100)
+    if preco_final is None:
+        preco_final = preco_venda * (1 - DESCONTO_PIX) if desconto else preco_venda
+    return df.assign(custo_reais=custo_reais, preco_venda=preco_venda, preco_final=preco_final)
@@ -0,0 +1,99 @@
+import numpy as np
+
+# modo -> descrição mostrada na tela
+ARREDONDAMENTOS = {
+    "": "Sem arredondamento",
+    ".x9": "Centavos terminando em 9 (25,93 → 25,99)",
+    ".99": "Terminando em ,99 (25,10 → 25,99)",
+    ".x0": "Décimos cheios (25,93 → 26,00)",
+}
+
+
+class Regra:
+    """Tabela calculada: `tabela = base × fator`, arredondada conforme `arredondamento`."""
+
+    def __init__(self, tabela, base, fator, arredondamento=""):
+        if arredondamento not in ARREDONDAMENTOS:
+            raise ValueError(f"arredondamento inválido: {arredondamento!r}")
+        if tabela == base:
+            raise ValueError("a tabela não pode ser calculada a partir dela mesma")
+        self.tabela = tabela
+        self.base = base
+        self.fator = float(fator)
+        self.arredondamento = arredondamento
+
+    def __repr__(self):
+        arr = f", {self.arredondamento}" if self.arredondamento else ""
+        return f"{self.tabela} = {self.base} × {self.fator:g}{arr}"
+
+    def __eq__(self, outra):
+        return isinstance(outra, Regra) and vars(self) == vars(outra)
+
+    def aplicar(self, base):
+        """Valores da tabela a partir dos da base (escalar ou array). Base zerada continua zero."""
+        v = np.asarray(base, dtype=np.float64) * self.fator
+        return np.where(v > 0, arredondar(v, self.arredondamento), 0.0)
+
+
+def arredondar(valores, modo):
+    v = np.asarray(valores, dtype=np.float64)
+    # round(…, 6) antes do ceil evita que 25,9 vire 25,900000000000002 e suba um degrau
+    if modo == ".x9": v = np.ceil(np.round((v + 0.01) * 10, 6)) / 10 - 0.01
+    elif modo == ".99": v = np.ceil(np.round(v + 0.01, 6)) - 0.01
+    elif modo == ".x0": v = np.ceil(np.round(v * 10, 6)) / 10
+    return np.round(v, 2)
+
+
+def ordenar(regras):
+    """Regras em ordem de cálculo (bases antes das derivadas). Ciclos geram ValueError."""
+    ordem, visitando, feitas = [], set(), set()
+
+    def visitar(tabela, caminho):
+        if tabela in feitas or tabela not in regras: return
+        if tabela in visitando:
+            raise ValueError("regras em ciclo: " + " → ".join(caminho + [tabela]))
+        visitando.add(tabela)
+        visitar(regras[tabela].base, caminho + [tabela])
+        visitando.discard(tabela)
+        feitas.add(tabela)
+        ordem.append(regras[tabela])
+
+    for t in regras: visitar(t, [])
+    return ordem
+
+
+class MotorRegras:
+    """Calcula as tabelas derivadas, em bloco ou só no que mudou."""
+
+    def __init__(self, regras):
+        self.regras = dict(regras or {})
+        self.ordem = ordenar(self.regras)
+
+    def __bool__(self):
+        return bool(self.regras)
+
+    def dependentes(self, tabelas):
+        """Regras afetadas (direta ou indiretamente) por mudanças em `tabelas`, em ordem de cálculo."""
+        sujas = set(tabelas)
+        afetadas = []
+        for r in self.ordem:
+            if r.base in sujas or r.tabela in sujas:
+                sujas.add(r.tabela)
+                afetadas.append(r)
+        return afetadas
+
+    def recalcular(self, df, tabelas=None):
+        """Recalcula as colunas derivadas (todas, ou só as que dependem de `tabelas`) em bloco."""
+        regras = self.ordem if tabelas is None else self.dependentes(tabelas)
+        if not regras: return df
+        novas = {}
+        for r in regras:
+            base = novas[r.base] if r.base in novas else df[r.base].to_numpy() if r.base in df.columns else 0.0
+            novas[r.tabela] = r.aplicar(base)
+        return df.assign(**novas)
+
+    def recalcular_linha(self, valores):
+        """Preenche, num dict de uma linha, as tabelas derivadas a partir das manuais."""
+        for r in self.ordem:
+            valores[r.tabela] = float(r.aplicar(float(valores.get(r.base, 0.0) or 0.0)))
+        return valores
@@ -0,0 +1,64 @@
+import os
+import threading
+from .catalogo import versao_arquivo
+
+ARQUIVO_PRODUTOS = "meus_produtos.csv"
+CHAVE = "sku"
+_lock_gravacao = threading.Lock()  # só reler + mesclar + gravar; quem lê não espera
+
+# --- FUNÇÕES DE "BANCO DE DADOS" DO SIMULADOR (Sem SQL, apenas arquivo local) ---
+def carregar_dados():
+    import pandas as pd
+    if not os.path.exists(ARQUIVO_PRODUTOS):
+        # Se não existe arquivo, cria dados iniciais de exemplo
+        dados_iniciais = [
+            {"sku": "JBL-01", "produto": "Caixa JBL Boombox 3", "imagem_url": "https://m.media-amazon.com/images/I/61s+N9j+bCL._AC_SL1000_.jpg", "custo_base": 1200.00, "moeda_base": "BRL"},
+            {"sku": "PIO-12", "produto": "Subwoofer Pioneer 12 pol", "imagem_url": "https://m.media-amazon.com/images/I/61bM8f5iVvL._AC_SL1000_.jpg", "custo_base": 85.00, "moeda_base": "USD"},
+            {"sku": "INT-CAM", "produto": "Câmera Intelbras iM3", "imagem_url": "https://m.media-amazon.com/images/I/61O0N9y+YLL._AC_SL1500_.jpg", "custo_base": 250.00, "moeda_base": "BRL"},
+        ]
+        df = pd.DataFrame(dados_iniciais)
+        df.to_csv(ARQUIVO_PRODUTOS, index=False)
+        return df
+    else:
+        return pd.read_csv(ARQUIVO_PRODUTOS)
+
+
+def gravar_dados(df, caminho=ARQUIVO_PRODUTOS):
+    # Arquivo temporário + troca atômica: quem lê no meio da gravação pega o arquivo anterior inteiro
+    tmp = f"{caminho}.{threading.get_ident()}.tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, caminho)
+
+
+def _por_sku(df):
+    # sku -> {coluna: valor} (NaN vira None para comparar); linhas sem sku ficam de fora
+    linhas = df.astype(object).where(df.notna(), None).to_dict("records")
+    return {str(l[CHAVE]).strip(): l for l in linhas if l.get(CHAVE) is not None and str(l[CHAVE]).strip()}
+
+
+def mesclar_alteracoes(base, editado, caminho=ARQUIVO_PRODUTOS):
+    """Grava só o que a sessão mudou entre `base` (o que ela leu) e `editado`, linha a linha por sku.
+
+    Sob um lock curto relê o arquivo atual e aplica por cima dele as inclusões, alterações e
+    exclusões da sessão; o que outras sessões gravaram nesse meio-tempo fica. Um sku mudado pela
+    sessão e também no arquivo desde `base` (para outro valor) é conflito e fica como está no arquivo.
+    Retorna (catálogo gravado ou None se nada mudou, versão do arquivo, skus em conflito).
+    """
+    import pandas as pd
+    antes, depois = _por_sku(base), _por_sku(editado)
+    # None = excluído pela sessão
+    alteracoes = {sku: depois.get(sku) for sku in {**antes, **depois} if antes.get(sku) != depois.get(sku)}
+    if not alteracoes: return None, versao_arquivo(caminho), []
+    with _lock_gravacao:
+        atual = pd.read_csv(caminho) if os.path.exists(caminho) else editado.iloc[:0]
+        linhas = _por_sku(atual)
+        conflitos = []
+        for sku, nova in alteracoes.items():
+            agora = linhas.get(sku)
+            if agora != antes.get(sku) and agora != nova:
+                conflitos.append(sku); continue
+            if nova is None: linhas.pop(sku, None)
+            else: linhas[sku] = nova
+        df = pd.DataFrame(list(linhas.values()), columns=list(atual.columns) or list(editado.columns))
+        gravar_dados(df, caminho)
+        return df, versao_arquivo(caminho), conflitos
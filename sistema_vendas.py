@@ -1,35 +1,68 @@
 import streamlit as st
-import pandas as pd
 import os
+import time
+from fantini import CacheCatalogo, calcular_precos, versao_arquivo
+from fantini.precificacao import CuboPrecos, arrays_custo
+from fantini.vendas import ARQUIVO_PRODUTOS as ARQUIVO_DB, carregar_dados, mesclar_alteracoes
+from fantini import desempenho
+from fantini.imagens_remotas import CacheImagensRemotas
 
 # --- CONFIGURAÇÃO INICIAL ---
 st.set_page_config(layout="wide", page_title="Fantini Sales System")
-ARQUIVO_DB = "meus_produtos.csv"
-
-# --- FUNÇÕES DE "BANCO DE DADOS" (Sem SQL, apenas arquivo local) ---
-def carregar_dados():
-    if not os.path.exists(ARQUIVO_DB):
-        # Se não existe arquivo, cria dados iniciais de exemplo
-        dados_iniciais = [
-            {"sku": "JBL-01", "produto": "Caixa JBL Boombox 3", "imagem_url": "https://m.media-amazon.com/images/I/61s+N9j+bCL._AC_SL1000_.jpg", "custo_base": 1200.00, "moeda_base": "BRL"},
-            {"sku": "PIO-12", "produto": "Subwoofer Pioneer 12 pol", "imagem_url": "https://m.media-amazon.com/images/I/61bM8f5iVvL._AC_SL1000_.jpg", "custo_base": 85.00, "moeda_base": "USD"},
-            {"sku": "INT-CAM", "produto": "Câmera Intelbras iM3", "imagem_url": "https://m.media-amazon.com/images/I/61O0N9y+YLL._AC_SL1500_.jpg", "custo_base": 250.00, "moeda_base": "BRL"},
-        ]
-        df = pd.DataFrame(dados_iniciais)
-        df.to_csv(ARQUIVO_DB, index=False)
-        return df
-    else:
-        return pd.read_csv(ARQUIVO_DB)
-
-def salvar_dados(df):
-    df.to_csv(ARQUIVO_DB, index=False)
-    st.toast("✅ Alterações salvas com sucesso!", icon="💾")
-
-# Carrega os dados na memória ao abrir
-if "df_produtos" not in st.session_state:
-    st.session_state["df_produtos"] = carregar_dados()
-
-df = st.session_state["df_produtos"]
+
+# Medição por etapa (só quando ligada no painel "Desempenho")
+if "desempenho" not in st.session_state: st.session_state["desempenho"] = desempenho.Coletor("sistema_vendas")
+coletor = st.session_state["desempenho"] if st.session_state.get("desempenho_ativo", desempenho.ATIVO_PADRAO) else None
+desempenho.usar(coletor)
+t_execucao = time.perf_counter()
+
+@st.cache_resource
+def cache_produtos():
+    # Uma cópia do catálogo para o processo todo, relida só quando o arquivo muda (mtime/tamanho)
+    return CacheCatalogo(lambda: versao_arquivo(ARQUIVO_DB), carregar_dados)
+
+@st.cache_resource
+def imagens_remotas():
+    # Fotos do catálogo baixadas uma vez (em segundo plano) e servidas de static/_remotas
+    return CacheImagensRemotas()
+
+def url_vitrine(url):
+    # Cópia local se já estiver pronta; senão o navegador ainda busca a original
+    local = imagens_remotas().local(url)
+    return "app/static/" + os.path.relpath(local, "static").replace(os.sep, "/") if local else url
+
+def salvar_dados(base, df):
+    # Só as linhas que esta sessão mudou vão para o arquivo; o que outras gravaram nesse meio-tempo fica
+    gravado, versao, conflitos = mesclar_alteracoes(base, df)
+    # Publica o que acabou de ser gravado: as outras sessões veem na próxima execução, sem reler o CSV
+    if gravado is not None: cache_produtos().publicar(gravado, versao)
+    if conflitos: st.session_state["conflitos_vendas"] = conflitos
+    else: st.toast("✅ Alterações salvas com sucesso!", icon="💾")
+
+with desempenho.etapa("carregar"):
+    catalogo = cache_produtos().obter()
+    df = catalogo.df
+with desempenho.etapa("imagens_remotas"):
+    imagens_remotas().prefetch(df["imagem_url"].tolist())  # só agenda o que falta ou venceu
+
+# Grade da tabela de sensibilidade, em volta dos valores atuais. Os widgets andam de 0,01 e de 1%,
+# então a grade quase nunca contém o próximo cenário: o preço da vitrine é calculado direto
+# (um cenário só) e o cubo só é montado quando a sensibilidade é pedida.
+PASSOS_DOLAR = (-0.20, -0.10, 0.0, 0.10, 0.20)
+PASSOS_MARGEM = (-10, -5, 0, 5, 10)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def custos_catalogo(versao, _df):
+    # Custo e máscara USD de uma versão do catálogo (`_df` não entra na chave: é o da `versao`)
+    return arrays_custo(_df)
+
+@st.cache_resource(max_entries=2)  # ~19 MB cada com 50 mil produtos
+def montar_cubo(versao, imposto, dolar, margem, _custos):
+    # `_custos` vem do catálogo desta sessão, da mesma `versao` que marca o cubo
+    custo, usd = _custos
+    dolares = [round(dolar + p, 2) for p in PASSOS_DOLAR if dolar + p > 0]
+    margens = [margem + p for p in PASSOS_MARGEM if 0 <= margem + p <= 100]
+    return CuboPrecos(custo, usd, dolares, margens, imposto, versao=versao)
 
 # --- INTERFACE ---
 st.title("🚀 Fantini - Sistema de Formação de Preço")
@@ -56,24 +89,22 @@ with tab_vitrine:
 
     st.divider()
 
-    # 2. Lógica de Cálculo
-    # Cria uma cópia para não estragar os dados originais
-    df_calc = df.copy()
-
-    # Normaliza tudo para BRL
-    # Se a moeda base for USD, multiplica pelo dolar. Se for BRL, mantém.
-    df_calc["custo_reais"] = df_calc.apply(
-        lambda x: x["custo_base"] * dolar if x["moeda_base"] == "USD" else x["custo_base"], axis=1
-    )
-
-    # Aplica Imposto + Margem
-    df_calc["preco_venda"] = df_calc["custo_reais"] * (1 + imposto/100) * (1 + margem/100)
-
-    # Aplica Desconto se ativado
-    if desconto:
-        df_calc["preco_final"] = df_calc["preco_venda"] * 0.95
-    else:
-        df_calc["preco_final"] = df_calc["preco_venda"]
+    # 2. Lógica de Cálculo (vetorizada). Cenário que caiu na grade do último cubo é só uma fatia;
+    # fora dela, calcula só este cenário (não remonta o cubo)
+    cubo = st.session_state.get("cubo_precos")
+    fatia = cubo.em(dolar, margem, desconto) \
+        if cubo is not None and cubo.versao == catalogo.versao and cubo.imposto == imposto else None
+    desempenho.contar("cubo_acerto" if fatia is not None else "cubo_falta")
+    with desempenho.etapa("calcular_precos"):
+        custos = custos_catalogo(catalogo.versao, df)
+        df_calc = calcular_precos(df, dolar, imposto, margem, desconto, preco_final=fatia, custos=custos)
+
+    with st.expander("📊 Sensibilidade: preço médio por Dólar × Margem"):
+        if st.toggle("Calcular cenários em volta dos valores atuais", key="sensibilidade"):
+            with desempenho.etapa("cubo"):
+                cubo = montar_cubo(catalogo.versao, imposto, dolar, margem, custos)
+                st.session_state["cubo_precos"] = cubo
+            st.dataframe(cubo.sensibilidade(desconto).style.format("R$ {:,.2f}"), use_container_width=True)
 
     # 3. Exibição Visual
     st.subheader(f"Catálogo Atualizado ({len(df_calc)} itens)")
@@ -95,13 +126,18 @@ with tab_vitrine:
         )
     }
 
-    st.dataframe(
-        df_calc[["imagem_url", "sku", "produto", "custo_base", "moeda_base", "preco_final"]],
-        column_config=column_config_vitrine,
-        use_container_width=True,
-        hide_index=True,
-        height=600
-    )
+    with desempenho.etapa("vitrine"):
+        urls = df_calc["imagem_url"].tolist()
+        prontas = imagens_remotas().prontas(urls)
+        if prontas < len(set(urls)): st.caption(f"🖼️ Fotos locais: {prontas}/{len(set(urls))} (o resto ainda vem do site)")
+        st.dataframe(
+            df_calc[["imagem_url", "sku", "produto", "custo_base", "moeda_base", "preco_final"]]
+                .assign(imagem_url=[url_vitrine(u) for u in urls]),
+            column_config=column_config_vitrine,
+            use_container_width=True,
+            hide_index=True,
+            height=600
+        )
 
 # ==============================================================================
 # ABA 2: CADASTRO (Edição direta)
@@ -117,18 +153,43 @@ with tab_cadastro:
         "moeda_base": st.column_config.SelectboxColumn("Moeda do Custo", options=["BRL", "USD"], required=True)
     }
 
+    conflitos = st.session_state.pop("conflitos_vendas", None)
+    if conflitos:
+        st.warning("⚠️ Alterados por outra sessão enquanto você editava (mantida a versão dela, confira e edite de novo): "
+                   + ", ".join(conflitos))
+
+    # O editor fica no retrato de quando a edição começou; sem edições pendentes, acompanha o catálogo
+    editor = st.session_state.get("editor_dados") or {}
+    pendente = any(editor.get(k) for k in ("edited_rows", "added_rows", "deleted_rows"))
+    if not pendente or "base_vendas" not in st.session_state: st.session_state["base_vendas"] = catalogo
+    base = st.session_state["base_vendas"]
+    if base.versao != catalogo.versao:
+        st.caption("ℹ️ Outra sessão gravou alterações; ao gravar, as suas entram linha a linha por cima delas.")
+
     # Editor de dados (permite adicionar linhas)
-    df_editado = st.data_editor(
-        df,
-        column_config=column_config_editor,
-        num_rows="dynamic", # Permite adicionar novas linhas
-        use_container_width=True,
-        hide_index=True,
-        key="editor_dados"
-    )
+    with desempenho.etapa("editor"):
+        df_editado = st.data_editor(
+            base.df,
+            column_config=column_config_editor,
+            num_rows="dynamic", # Permite adicionar novas linhas
+            use_container_width=True,
+            hide_index=True,
+            key="editor_dados"
+        )
 
     # Botão Salvar
     if st.button("💾 Gravar Alterações", type="primary"):
-        st.session_state["df_produtos"] = df_editado # Atualiza sessão
-        salvar_dados(df_editado) # Atualiza arquivo físico
-        st.rerun() # Recarrega para atualizar a Vitrine
\ No newline at end of file
+        with desempenho.etapa("salvar"):
+            salvar_dados(base.df, df_editado) # Atualiza arquivo físico e o catálogo compartilhado
+        # Edições gravadas: o editor recomeça sobre o catálogo atual
+        del st.session_state["editor_dados"]; st.session_state.pop("base_vendas", None)
+        st.rerun() # Recarrega para atualizar a Vitrine
+
+# --- DESEMPENHO ---
+with st.sidebar:
+    st.toggle("⏱️ Desempenho", value=desempenho.ATIVO_PADRAO, key="desempenho_ativo",
+              help="Mede cada etapa desta sessão e grava no log JSONL")
+if coletor is not None:
+    coletor.registrar("execucao", time.perf_counter() - t_execucao)
+    desempenho.painel(coletor)
+    coletor.fechar()